@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from reducao import lttb, minmax_por_bucket
+
+# ********************* JANELAS DE TEMPO E REDUÇÃO DE PONTOS *********************************
+
+JANELAS = {
+    "Última hora": pd.Timedelta(hours=1),
+    "Último dia": pd.Timedelta(days=1),
+    "Última semana": pd.Timedelta(weeks=1),
+    "Tudo": None,
+    "Personalizado": None
+}
+
+
+def recorta_janela(df, inicio=None, fim=None, coluna="tempo_registro"):
+    """Linhas com `coluna` entre inicio e fim (inclusive).
+
+    Se a coluna estiver ordenada (o caso normal, ids e tempos crescem juntos)
+    o recorte é feito com busca binária e devolve uma fatia, sem copiar.
+    """
+    if inicio is None and fim is None:
+        return df
+    tempos = df[coluna]
+    if tempos.is_monotonic_increasing:
+        valores = tempos.to_numpy()
+        a = 0 if inicio is None else np.searchsorted(valores, np.datetime64(inicio), side="left")
+        b = len(valores) if fim is None else np.searchsorted(valores, np.datetime64(fim), side="right")
+        return df.iloc[a:b]
+    mascara = np.ones(len(df), dtype=bool)
+    if inicio is not None:
+        mascara &= (tempos >= inicio).to_numpy()
+    if fim is not None:
+        mascara &= (tempos <= fim).to_numpy()
+    return df[mascara]
+
+
+def serie_reduzida(df, colunas, pontos, metodo="lttb", coluna_tempo="tempo_registro"):
+    """Formato longo (tempo, valor, registro) com no máximo `pontos` linhas por coluna."""
+    reduzir = lttb if metodo == "lttb" else minmax_por_bucket
+    x = df[coluna_tempo].to_numpy().astype("datetime64[ns]").astype("int64")
+    partes = []
+    for coluna in colunas:
+        if coluna not in df.columns:
+            continue
+        y = df[coluna].to_numpy(dtype="float64")
+        indices = reduzir(x, y, pontos)
+        partes.append(pd.DataFrame({
+            coluna_tempo: df[coluna_tempo].to_numpy()[indices],
+            "valor": y[indices],
+            "registro": coluna
+        }))
+    if not partes:
+        return pd.DataFrame(columns=[coluna_tempo, "valor", "registro"])
+    return pd.concat(partes, ignore_index=True)
+
+
+def serie_longa(serie, coluna_tempo="tempo_registro"):
+    """Séries já reduzidas pela API ({medida: {tempo, valor}}) no formato de serie_reduzida."""
+    partes = [pd.DataFrame({
+        coluna_tempo: pd.to_datetime(pontos[coluna_tempo]),
+        "valor": pd.to_numeric(pd.Series(pontos["valor"], dtype="object"), errors="coerce"),
+        "registro": coluna
+    }) for coluna, pontos in serie.items()]
+    if not partes:
+        return pd.DataFrame(columns=[coluna_tempo, "valor", "registro"])
+    return pd.concat(partes, ignore_index=True)
+
+
+def linhas_reduzidas(df, pontos, coluna, coluna_tempo="tempo_registro"):
+    """Subconjunto de linhas (mín/máx de `coluna` por bucket de tempo) com no máximo `pontos` linhas."""
+    if len(df) <= pontos:
+        return df
+    x = df[coluna_tempo].to_numpy().astype("datetime64[ns]").astype("int64")
+    indices = minmax_por_bucket(x, df[coluna].to_numpy(dtype="float64"), pontos)
+    return df.iloc[indices]
@@ -0,0 +1,248 @@
+import os
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from exportacao import importa_pyarrow, lote_arrow, schema_arrow
+
+# ********************* ARQUIVO DE REGISTROS ANTIGOS (Parquet por dia) *********************************
+#
+# Registros mais antigos que a retenção saem da tabela `registro` e vão para
+# arquivos Parquet compactados, um diretório por dia:
+#
+#   <diretorio>/2024-05-01/parte-000000001000-000000001999.parquet
+#
+# O dia e a faixa de ids de cada arquivo ficam no caminho, então as leituras
+# descartam arquivos fora do intervalo de tempo ou de ids sem abri-los.
+#
+# A lista de arquivos fica em memória. `arquivar` e `remover` (que rodam em
+# outro processo, pelo flask registro-arquivar ou no DELETE da API) regravam
+# <diretorio>/.versao depois de mexer nos arquivos, e a lista é refeita quando
+# o stat desse arquivo muda.
+
+ARQUIVO_VERSAO = ".versao"
+CAMPOS_ARQUIVO = ("id", "dispositivo", "temperatura", "pressao", "altitude", "umidade", "co2", "tempo_registro")
+
+
+class Parte:
+    __slots__ = ("dia", "primeiro_id", "ultimo_id", "caminho")
+
+    def __init__(self, dia, primeiro_id, ultimo_id, caminho):
+        self.dia = dia
+        self.primeiro_id = primeiro_id
+        self.ultimo_id = ultimo_id
+        self.caminho = caminho
+
+
+class ArquivoRegistros:
+    """Arquivo de registros em Parquet, particionado por dia de tempo_registro."""
+
+    def __init__(self, diretorio, compressao="zstd"):
+        self.diretorio = diretorio
+        self.compressao = compressao
+        # (versão, partes): trocado inteiro para as threads da API lerem sem lock
+        self._catalogo = (None, [])
+
+    # ---------------- catálogo ----------------
+
+    def _versao(self):
+        try:
+            info = os.stat(os.path.join(self.diretorio, ARQUIVO_VERSAO))
+        except FileNotFoundError:
+            return (self.diretorio, None)
+        return (self.diretorio, info.st_ino, info.st_mtime_ns)
+
+    def _listar(self):
+        partes = []
+        for pasta in os.scandir(self.diretorio):
+            try:
+                dia = date.fromisoformat(pasta.name)
+            except ValueError:
+                continue
+            for arquivo in os.scandir(pasta.path):
+                nome = arquivo.name
+                if not (nome.startswith("parte-") and nome.endswith(".parquet")):
+                    continue
+                primeiro, ultimo = (int(x) for x in nome[len("parte-"):-len(".parquet")].split("-"))
+                partes.append(Parte(dia, primeiro, ultimo, arquivo.path))
+        partes.sort(key=lambda parte: parte.primeiro_id)
+        return partes
+
+    def partes(self, de=None, ate=None, after_id=0):
+        """Arquivos que podem ter registros com id > after_id e tempo em [de, ate], por primeiro id."""
+        if not os.path.isdir(self.diretorio):
+            return []
+        # A versão é lida antes da listagem: um arquivamento no meio dela
+        # deixa o catálogo com a versão antiga e ele é refeito na próxima chamada.
+        versao = self._versao()
+        if self._catalogo[0] != versao:
+            self._catalogo = (versao, self._listar())
+        partes = []
+        for parte in self._catalogo[1]:
+            if parte.ultimo_id <= after_id:
+                continue
+            if de is not None and datetime.combine(parte.dia + timedelta(days=1), datetime.min.time()) <= de:
+                continue
+            if ate is not None and datetime.combine(parte.dia, datetime.min.time()) > ate:
+                continue
+            partes.append(parte)
+        return partes
+
+    def vazio(self):
+        return not self.partes()
+
+    # ---------------- escrita ----------------
+
+    def arquivar(self, linhas):
+        """Grava linhas (tuplas na ordem de CAMPOS_ARQUIVO) separadas por dia. Retorna os caminhos."""
+        pq = _parquet()
+        schema = schema_arrow(CAMPOS_ARQUIVO)
+        por_dia = {}
+        for linha in linhas:
+            por_dia.setdefault(linha[-1].date(), []).append(linha)
+
+        caminhos = []
+        for dia, linhas_dia in sorted(por_dia.items()):
+            pasta = os.path.join(self.diretorio, dia.isoformat())
+            os.makedirs(pasta, exist_ok=True)
+            ids = [linha[0] for linha in linhas_dia]
+            caminho = os.path.join(pasta, f"parte-{min(ids):012d}-{max(ids):012d}.parquet")
+            # Escreve em um temporário e renomeia: um arquivo nunca fica pela metade
+            tmp = caminho + ".tmp"
+            tabela = importa_pyarrow().Table.from_batches([lote_arrow(schema, linhas_dia)])
+            pq.write_table(tabela, tmp, compression=self.compressao)
+            os.replace(tmp, caminho)
+            caminhos.append(caminho)
+        if caminhos:
+            self._nova_versao()
+        return caminhos
+
+    def remover(self, registro_id):
+        """Apaga um registro arquivado regravando o arquivo dele. False se o id não está no arquivo."""
+        pq = _parquet()
+        import pyarrow.compute as pc
+        removido = False
+        for parte in self.partes(after_id=registro_id - 1):
+            if not parte.primeiro_id <= registro_id <= parte.ultimo_id:
+                continue
+            tabela = pq.read_table(parte.caminho)
+            restante = tabela.filter(pc.not_equal(tabela.column("id"), registro_id))
+            if restante.num_rows == tabela.num_rows:
+                continue
+            if restante.num_rows:
+                # A faixa de ids do nome continua cobrindo as linhas que sobraram
+                tmp = parte.caminho + ".tmp"
+                pq.write_table(restante, tmp, compression=self.compressao)
+                os.replace(tmp, parte.caminho)
+            else:
+                os.remove(parte.caminho)
+            removido = True
+        if removido:
+            self._nova_versao()
+        return removido
+
+    def _nova_versao(self):
+        # Arquivo novo (outro inode) a cada mudança: invalida o catálogo dos
+        # outros processos mesmo com mtime de baixa resolução
+        versao = os.path.join(self.diretorio, ARQUIVO_VERSAO)
+        with open(versao + ".tmp", "w") as f:
+            f.write(f"{time.time_ns()}\n")
+        os.replace(versao + ".tmp", versao)
+
+    # ---------------- leitura ----------------
+
+    def ler(self, campos, after_id=0, limite=None, de=None, ate=None, dispositivo=None, until_id=None):
+        """Tuplas (id, *campos) com after_id < id <= until_id que passam nos filtros, em ordem de id.
+
+        Lê os arquivos em ordem de primeiro id e para assim que os próximos
+        só poderiam ter ids maiores que os `limite` já encontrados.
+        """
+        partes = self.partes(de, ate, after_id)
+        if not partes:
+            return []
+        pa = importa_pyarrow()
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        filtro = pc.field("id") > after_id
+        if until_id is not None:
+            partes = [parte for parte in partes if parte.primeiro_id <= until_id]
+            filtro = filtro & (pc.field("id") <= until_id)
+        if de is not None:
+            filtro = filtro & (pc.field("tempo_registro") >= pa.scalar(de, pa.timestamp("us")))
+        if ate is not None:
+            filtro = filtro & (pc.field("tempo_registro") <= pa.scalar(ate, pa.timestamp("us")))
+        if dispositivo is not None:
+            filtro = filtro & (pc.field("dispositivo") == dispositivo)
+        colunas = list(dict.fromkeys(("id",) + tuple(campos)))
+
+        tabelas = []
+        encontrados = 0
+        limite_id = None
+        for parte in partes:
+            if limite_id is not None and parte.primeiro_id > limite_id:
+                break
+            tabela = ds.dataset(parte.caminho, format="parquet").to_table(columns=colunas, filter=filtro)
+            if tabela.num_rows:
+                tabelas.append(tabela)
+                encontrados += tabela.num_rows
+            if limite is not None and encontrados >= limite:
+                # Id do limite-ésimo menor encontrado até aqui
+                ids = pa.concat_tables(tabelas).column("id").to_numpy()
+                limite_id = int(np.partition(ids, limite - 1)[limite - 1])
+        if not tabelas:
+            return []
+        tabela = pa.concat_tables(tabelas).sort_by("id")
+        if limite is not None:
+            tabela = tabela.slice(0, limite)
+        return list(zip(*(tabela.column(campo).to_pylist() for campo in ("id",) + tuple(campos))))
+
+    def ids_ate(self, ultimo_id):
+        """Ids arquivados até `ultimo_id` (inclusive)."""
+        import pyarrow.dataset as ds
+        import pyarrow.compute as pc
+        caminhos = [parte.caminho for parte in self.partes() if parte.primeiro_id <= ultimo_id]
+        if not caminhos:
+            return []
+        tabela = ds.dataset(caminhos, format="parquet").to_table(
+            columns=["id"], filter=pc.field("id") <= ultimo_id)
+        return tabela.column("id").to_pylist()
+
+    def contagem(self, ultimo_id=None):
+        """Quantos registros arquivados têm id até `ultimo_id` (inclusive; None = todos)."""
+        import pyarrow.dataset as ds
+        import pyarrow.compute as pc
+        caminhos = [parte.caminho for parte in self.partes() if ultimo_id is None or parte.primeiro_id <= ultimo_id]
+        if not caminhos:
+            return 0
+        # Sem filtro (ou com o arquivo todo abaixo do limite) o pyarrow conta pelos metadados
+        filtro = None if ultimo_id is None else pc.field("id") <= ultimo_id
+        return ds.dataset(caminhos, format="parquet").count_rows(filter=filtro)
+
+    def busca_id(self, registro_id, campos):
+        """Tupla (id, *campos) do registro arquivado com esse id, ou None."""
+        for parte in self.partes(after_id=registro_id - 1):
+            if parte.primeiro_id <= registro_id <= parte.ultimo_id:
+                linhas = self.ler(campos, after_id=registro_id - 1, limite=1)
+                if linhas and linhas[0][0] == registro_id:
+                    return linhas[0]
+                return None
+        return None
+
+    def metricas(self):
+        partes = self.partes()
+        return {
+            "arquivos": len(partes),
+            "dias": len({parte.dia for parte in partes}),
+            "bytes": sum(os.path.getsize(parte.caminho) for parte in partes),
+            "primeiro_dia": min(parte.dia for parte in partes).isoformat() if partes else None,
+            "ultimo_dia": max(parte.dia for parte in partes).isoformat() if partes else None
+        }
+
+
+def _parquet():
+    importa_pyarrow()
+    import pyarrow.parquet as pq
+    return pq
+
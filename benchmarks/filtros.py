@@ -0,0 +1,97 @@
+"""Custo por rerun do dashboard: filtros e contagens dos gráficos de pizza.
+
+Compara o caminho antigo do dash.py (df.copy() + uma máscara por slider +
+group_data alterando a seleção) com o módulo filtros.
+
+    python benchmarks/filtros.py --linhas 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filtros import aplica_filtros, contagem_bins  # noqa: E402
+
+MEDIDAS = ["temperatura", "pressao", "altitude", "umidade", "co2"]
+
+
+def gera_dados(linhas, semente=0):
+    rng = np.random.default_rng(semente)
+    return pd.DataFrame({
+        "id": np.arange(1, linhas + 1),
+        "temperatura": rng.normal(25, 5, linhas).round(2),
+        "pressao": rng.normal(1013, 10, linhas).round(2),
+        "altitude": rng.normal(760, 30, linhas).round(2),
+        "umidade": rng.uniform(20, 90, linhas).round(2),
+        "co2": rng.normal(800, 300, linhas).round(2),
+        "tempo_registro": pd.date_range("2024-01-01", periods=linhas, freq="s")
+    })
+
+
+def faixas_de(df):
+    # Corta 5% de cada lado em todas as medidas
+    return {m: (df[m].quantile(0.05), df[m].quantile(0.95)) for m in MEDIDAS}
+
+
+def caminho_antigo(df, faixas):
+    df_selection = df.copy()
+    for coluna, (minimo, maximo) in faixas.items():
+        df_selection = df_selection[(df_selection[coluna] >= minimo) & (df_selection[coluna] <= maximo)]
+
+    def group_data(df, column, interval=None):
+        if interval:
+            df[column] = (df[column] // interval * interval).astype(int)
+        else:
+            df[column] = df[column].astype(int)
+        return df.groupby(by=column).size().reset_index(name='contagem')
+
+    df_selection = df_selection.copy()  # evita SettingWithCopyWarning; o dash.py alterava a fatia
+    return [group_data(df_selection, m, 1000 if m in ["co2", "pressao"] else None) for m in MEDIDAS]
+
+
+def caminho_novo(df, faixas):
+    df_selection = aplica_filtros(df, faixas)
+    return [
+        contagem_bins(df_selection[m].to_numpy(), 1000 if m in ["co2", "pressao"] else None, nome=m)
+        for m in MEDIDAS
+    ]
+
+
+def mede(funcao, *args, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), sum(tempos) / len(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    df = gera_dados(args.linhas)
+    faixas = faixas_de(df)
+
+    # Os dois caminhos precisam dar as mesmas contagens
+    for antigo, novo in zip(caminho_antigo(df, faixas), caminho_novo(df, faixas)):
+        assert antigo["contagem"].tolist() == novo["contagem"].tolist()
+
+    resultados = {}
+    for nome, funcao in [("antigo", caminho_antigo), ("novo", caminho_novo)]:
+        melhor, media = mede(funcao, df, faixas, repeticoes=args.repeticoes)
+        resultados[nome] = {"melhor_ms": melhor * 1000, "media_ms": media * 1000}
+        print(f"{nome:>7}: melhor {melhor * 1000:8.1f} ms | média {media * 1000:8.1f} ms ({args.linhas} linhas)")
+    print(f"ganho: {resultados['antigo']['media_ms'] / resultados['novo']['media_ms']:.1f}x")
+    return resultados
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Custo de devolver N registros em JSON: Registro.to_json + json.dumps vs serializacao.
+
+Usa um SQLite em memória com a tabela registro para medir também a consulta:
+o caminho antigo monta objetos do ORM e chama to_json() em cada um; o novo
+lê tuplas de colunas e usa CodificadorRegistros.
+
+    python benchmarks/serializacao.py --linhas 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from models import Registro, mybd  # noqa: E402
+from serializacao import CodificadorRegistros, corpo_json  # noqa: E402
+
+CAMPOS = ("id", "dispositivo", "temperatura", "pressao", "altitude", "umidade", "co2", "tempo_registro")
+
+
+def prepara_banco(linhas, semente=0):
+    aleatorio = random.Random(semente)
+    engine = create_engine("sqlite://")
+    mybd.metadata.create_all(engine, tables=[Registro.__table__])
+    inicio = datetime(2024, 1, 1)
+    valores = [{
+        "dispositivo": f"Grupo{i % 10}",
+        "temperatura": Decimal(f"{aleatorio.gauss(25, 5):.2f}"),
+        "pressao": Decimal(f"{aleatorio.gauss(1013, 10):.2f}"),
+        "altitude": Decimal(f"{aleatorio.gauss(760, 30):.2f}"),
+        "umidade": Decimal(f"{aleatorio.uniform(20, 90):.2f}"),
+        "co2": Decimal(f"{aleatorio.gauss(800, 300):.2f}"),
+        "tempo_registro": inicio + timedelta(seconds=i)
+    } for i in range(linhas)]
+    with engine.begin() as conexao:
+        conexao.execute(insert(Registro.__table__), valores)
+    return engine
+
+
+def caminho_antigo(engine):
+    with Session(engine) as sessao:
+        registros = sessao.query(Registro).order_by(Registro.id).all()
+        return json.dumps({"registro": [registro.to_json() for registro in registros]})
+
+
+def caminho_novo(engine):
+    colunas = [getattr(Registro, campo) for campo in CAMPOS]
+    with engine.connect() as conexao:
+        linhas = conexao.execute(select(*colunas).order_by(Registro.id)).all()
+    return corpo_json("registro", CodificadorRegistros(CAMPOS).lista(linhas))
+
+
+def mede(funcao, *args, repeticoes=3):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), sum(tempos) / len(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = prepara_banco(args.linhas)
+
+    # Os dois caminhos precisam devolver o mesmo conteúdo
+    assert json.loads(caminho_antigo(engine)) == json.loads(caminho_novo(engine))
+
+    resultados = {}
+    for nome, funcao in [("antigo", caminho_antigo), ("novo", caminho_novo)]:
+        melhor, media = mede(funcao, engine, repeticoes=args.repeticoes)
+        resultados[nome] = {"melhor_ms": melhor * 1000, "media_ms": media * 1000}
+        print(f"{nome:>7}: melhor {melhor * 1000:8.1f} ms | média {media * 1000:8.1f} ms ({args.linhas} linhas)")
+    print(f"ganho: {resultados['antigo']['media_ms'] / resultados['novo']['media_ms']:.1f}x")
+    return resultados
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import jsonify, request
+
+# ********************* CACHE DAS ÚLTIMAS LEITURAS *********************************
+
+
+class BufferCircular:
+    """Buffer de capacidade fixa: acrescentar é O(1) e a memória não cresce.
+
+    Guarda pares (timestamp, leitura) em uma lista pré-alocada; as leituras
+    copiam só as referências sob o lock, que fica preso por muito pouco tempo.
+    """
+
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self._itens = [None] * capacidade
+        self._proximo = 0
+        self._quantidade = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._quantidade
+
+    def acrescentar(self, timestamp, leitura):
+        with self._lock:
+            self._itens[self._proximo] = (timestamp, leitura)
+            self._proximo = (self._proximo + 1) % self.capacidade
+            if self._quantidade < self.capacidade:
+                self._quantidade += 1
+
+    def ultimo(self):
+        with self._lock:
+            if not self._quantidade:
+                return None
+            return self._itens[self._proximo - 1]
+
+    def ultimos(self, n):
+        """Até n itens, do mais antigo para o mais recente."""
+        with self._lock:
+            n = max(0, min(n, self._quantidade))
+            inicio = self._proximo - n
+            if inicio >= 0:
+                return self._itens[inicio:self._proximo]
+            return self._itens[inicio:] + self._itens[:self._proximo]
+
+    def desde(self, timestamp):
+        return [item for item in self.ultimos(self.capacidade) if item[0] >= timestamp]
+
+
+class CacheLeituras:
+    """Últimas leituras por dispositivo (ou tópico), sem acessar o banco.
+
+    Cada dispositivo tem um BufferCircular de `capacidade` itens; no máximo
+    `max_dispositivos` são mantidos (o menos recente é descartado).
+    """
+
+    def __init__(self, capacidade=1000, max_dispositivos=100):
+        self.capacidade = capacidade
+        self.max_dispositivos = max_dispositivos
+        self._buffers = OrderedDict()
+        self._lock = threading.Lock()
+        self._ultima = None
+
+    def _buffer(self, dispositivo):
+        with self._lock:
+            buffer = self._buffers.get(dispositivo)
+            if buffer is None:
+                buffer = BufferCircular(self.capacidade)
+                self._buffers[dispositivo] = buffer
+                if len(self._buffers) > self.max_dispositivos:
+                    self._buffers.popitem(last=False)
+            else:
+                self._buffers.move_to_end(dispositivo)
+            return buffer
+
+    def registrar(self, dispositivo, leitura):
+        """Guarda a leitura; o timestamp é o do payload ou, sem ele, o de recebimento."""
+        try:
+            timestamp = float(leitura.get('timestamp'))
+        except (TypeError, ValueError, AttributeError):
+            timestamp = time.time()
+        self._buffer(dispositivo).acrescentar(timestamp, leitura)
+        self._ultima = leitura
+
+    def ultima(self):
+        """Última leitura recebida, de qualquer dispositivo."""
+        return self._ultima
+
+    def _selecionados(self, dispositivo):
+        with self._lock:
+            if dispositivo is None:
+                return list(self._buffers.items())
+            buffer = self._buffers.get(dispositivo)
+            return [(dispositivo, buffer)] if buffer is not None else []
+
+    def ultimas(self, dispositivo=None):
+        return {d: b.ultimo()[1] for d, b in self._selecionados(dispositivo) if len(b)}
+
+    def recentes(self, n, dispositivo=None):
+        return {d: [leitura for _, leitura in b.ultimos(n)] for d, b in self._selecionados(dispositivo)}
+
+    def desde(self, timestamp, dispositivo=None):
+        return {d: [leitura for _, leitura in b.desde(timestamp)] for d, b in self._selecionados(dispositivo)}
+
+
+def registra_rotas(app, cache):
+    """Endpoints /data/latest, /data/recent e /data/since respondidos só pelo cache."""
+    @app.route('/data/latest', methods=['GET'])
+    def get_data_latest():
+        return jsonify(cache.ultimas(request.args.get('dispositivo')))
+
+    @app.route('/data/recent', methods=['GET'])
+    def get_data_recent():
+        try:
+            n = int(request.args.get('n', 10))
+        except ValueError:
+            return jsonify({"error": "n deve ser um inteiro"}), 400
+        return jsonify(cache.recentes(min(max(n, 0), cache.capacidade), request.args.get('dispositivo')))
+
+    @app.route('/data/since', methods=['GET'])
+    def get_data_since():
+        try:
+            ts = float(request.args['ts'])
+        except (KeyError, ValueError):
+            return jsonify({"error": "Informe ts (timestamp unix)"}), 400
+        return jsonify(cache.desde(ts, request.args.get('dispositivo')))
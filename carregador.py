@@ -0,0 +1,119 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Colunas devolvidas por query.SELECT_REGISTRO
+COLUNAS = ["id", "temperatura", "pressao", "altitude", "umidade", "co2", "tempo_registro", "dispositivo"]
+TIPOS = {
+    "id": "int64",
+    "temperatura": "float64",
+    "pressao": "float64",
+    "altitude": "float64",
+    "umidade": "float64",
+    "co2": "float64",
+    "tempo_registro": "datetime64[ns]",
+    "dispositivo": "object"
+}
+
+
+class CarregadorIncremental:
+    """Mantém a tabela registro em memória e busca só as linhas novas.
+
+    Os dados ficam em arrays NumPy por coluna com capacidade extra, então
+    acrescentar k linhas custa O(k) (amortizado). A cada `ttl` segundos (ou
+    quando `atualizar(forcar=True)`) são lidas as linhas com id maior que o
+    último visto; a cada `intervalo_reconciliacao` segundos a contagem do
+    banco é comparada com a local para descobrir registros apagados.
+
+    `buscar_novos(ultimo_id)` devolve tuplas na ordem de COLUNAS (ou uma
+    pyarrow.Table com essas colunas), ou um gerador de blocos assim em
+    ordem de id, acrescentados um a um conforme chegam,
+    `contar_ate(ultimo_id)` a quantidade de linhas com id <= ultimo_id e
+    `buscar_ids_ate(ultimo_id)` os ids dessas linhas.
+    """
+
+    def __init__(self, buscar_novos, contar_ate, buscar_ids_ate, ttl=30.0, intervalo_reconciliacao=300.0):
+        self.buscar_novos = buscar_novos
+        self.contar_ate = contar_ate
+        self.buscar_ids_ate = buscar_ids_ate
+        self.ttl = ttl
+        self.intervalo_reconciliacao = intervalo_reconciliacao
+        self._lock = threading.Lock()
+        self._arrays = {c: np.empty(0, dtype=TIPOS[c]) for c in COLUNAS}
+        self._tamanho = 0
+        self._versao = 0
+        self._frame = None
+        self._versao_frame = -1
+        self.ultimo_id = 0
+        self.ultima_atualizacao = 0.0
+        self.ultima_reconciliacao = time.monotonic()
+
+    def __len__(self):
+        return self._tamanho
+
+    def _acrescentar(self, linhas):
+        if hasattr(linhas, "column_names"):
+            # pyarrow.Table (carga pela API em Arrow): colunas direto para NumPy
+            colunas = [linhas.column(c).to_numpy(zero_copy_only=False) for c in COLUNAS]
+        else:
+            colunas = list(zip(*linhas))
+        novos = len(linhas)
+        necessario = self._tamanho + novos
+        if necessario > len(self._arrays["id"]):
+            capacidade = max(necessario, 2 * len(self._arrays["id"]), 1024)
+            for coluna in COLUNAS:
+                maior = np.empty(capacidade, dtype=TIPOS[coluna])
+                maior[:self._tamanho] = self._arrays[coluna][:self._tamanho]
+                self._arrays[coluna] = maior
+
+        for coluna, valores in zip(COLUNAS, colunas):
+            # Decimal e None viram float/NaN na conversão
+            self._arrays[coluna][self._tamanho:necessario] = np.asarray(valores, dtype=TIPOS[coluna])
+        self._tamanho = necessario
+        self.ultimo_id = int(self._arrays["id"][necessario - 1])
+        self._versao += 1
+
+    def _reconciliar(self):
+        """Remove da memória as linhas que foram apagadas no banco."""
+        self.ultima_reconciliacao = time.monotonic()
+        if self.contar_ate(self.ultimo_id) == self._tamanho:
+            return 0
+        ids_banco = np.asarray(self.buscar_ids_ate(self.ultimo_id), dtype="int64")
+        manter = np.isin(self._arrays["id"][:self._tamanho], ids_banco, assume_unique=True)
+        removidos = int(self._tamanho - manter.sum())
+        # Arrays novos: DataFrames já entregues continuam válidos
+        self._arrays = {c: self._arrays[c][:self._tamanho][manter] for c in COLUNAS}
+        self._tamanho = len(self._arrays["id"])
+        self._versao += 1
+        return removidos
+
+    def atualizar(self, forcar=False):
+        """Busca as linhas novas se o TTL venceu (ou se `forcar`). Retorna quantas chegaram."""
+        with self._lock:
+            agora = time.monotonic()
+            if not forcar and agora - self.ultima_atualizacao < self.ttl:
+                return 0
+            novos = self.buscar_novos(self.ultimo_id)
+            blocos = [novos] if isinstance(novos, list) or hasattr(novos, "column_names") else novos
+            chegaram = 0
+            for linhas in blocos:
+                if len(linhas):
+                    self._acrescentar(linhas)
+                    chegaram += len(linhas)
+            self.ultima_atualizacao = agora
+            if forcar or agora - self.ultima_reconciliacao >= self.intervalo_reconciliacao:
+                self._reconciliar()
+            return chegaram
+
+    def dataframe(self):
+        """DataFrame com os dados atuais (visões dos arrays internos, não deve ser alterado)."""
+        with self._lock:
+            if self._versao_frame != self._versao:
+                self._frame = pd.DataFrame(
+                    {c: self._arrays[c][:self._tamanho] for c in COLUNAS},
+                    copy=False
+                )
+                self._versao_frame = self._versao
+            return self._frame
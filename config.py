@@ -1,24 +1,39 @@
 import json
 import time
 from flask import Flask, jsonify, request
+import os
 import paho.mqtt.client as mqtt
+from cache_leituras import CacheLeituras, registra_rotas
+from ingestao import MQTT_TOPICO, dispositivo_do_topico
+from transmissao import Transmissor, evento_mqtt, registra_rotas_transmissao
 
 app = Flask(__name__)
 
-# Variável global para armazenar os dados recebidos do MQTT
-mqtt_data = {}
+# Últimas leituras recebidas do MQTT, por tópico (memória limitada e acesso com lock)
+cache_leituras = CacheLeituras(
+    capacidade=int(os.environ.get('CACHE_LEITURAS_CAPACIDADE', 1000)),
+    max_dispositivos=int(os.environ.get('CACHE_LEITURAS_MAX_DISPOSITIVOS', 100))
+)
+
+# Eventos ao vivo para /data/stream e /data/poll
+transmissor = Transmissor(
+    capacidade=int(os.environ.get('TRANSMISSAO_CAPACIDADE', 1000)),
+    limite_backlog=int(os.environ.get('TRANSMISSAO_LIMITE_BACKLOG', 500)),
+    max_assinantes=int(os.environ.get('TRANSMISSAO_MAX_ASSINANTES', 100))
+)
 
 # Função de callback chamada quando a conexão MQTT é estabelecida
 def on_connect(client, userdata, flags, rc):
     print("Connected with result code " + str(rc))
     # Subscreva no tópico desejado
-    client.subscribe("projeto_integrado/SENAI134/Cienciadedados/GrupoX") #TOPICO QUE O ESP32 ESTARÁ PUBLICANDO
+    client.subscribe(MQTT_TOPICO) #TOPICOS QUE OS ESP32 ESTARÃO PUBLICANDO
 
 # Função de callback chamada quando uma mensagem é recebida
 def on_message(client, userdata, msg):
-    global mqtt_data
     payload = msg.payload.decode('utf-8')
     mqtt_data = json.loads(payload)
+    cache_leituras.registrar(dispositivo_do_topico(msg.topic), mqtt_data)
+    transmissor.publicar(evento_mqtt(msg.topic, mqtt_data))
     print(f"Received message: {mqtt_data}")
 
 # Configure o cliente MQTT
@@ -34,7 +49,11 @@ def start_mqtt():
 # Endpoint para obter os dados mais recentes
 @app.route('/data', methods=['GET'])
 def get_data():
-    return jsonify(mqtt_data)
+    ultima = cache_leituras.ultima()
+    return jsonify(ultima if ultima is not None else {})
+
+registra_rotas(app, cache_leituras)
+registra_rotas_transmissao(app, transmissor)
 
 if __name__ == '__main__':
     start_mqtt()
@@ -0,0 +1,57 @@
+"""Consumidor MQTT sem a API HTTP, para rodar ao lado dos workers do wsgi.py.
+
+    python consumidor.py
+
+Assina $share/<MQTT_GRUPO>/<tópico> (assinatura compartilhada do MQTT 5),
+então vários consumidores, na mesma máquina ou não, dividem as mensagens
+entre si em vez de cada um gravar todas. Cada processo grava pelo seu
+próprio spool (SPOOL_DIR/NN) e só um por máquina, o que pegar a trava do
+estado da planilha, exporta para o Google Sheets.
+
+A exportação é de uma máquina só: a trava, o estado da planilha e a marca
+de resync (criada pelos DELETE dos workers, ver SheetsSync.marcar_resync)
+são arquivos locais. Rode os workers da API na mesma máquina do
+consumidor que exporta e, nas outras, use SHEETS_EXPORTAR=0; sem isso,
+consumidores em duas máquinas exportariam cada linha duas vezes.
+
+A entrega é "pelo menos uma vez": uma mensagem reentregue pelo broker a
+outro consumidor depois de uma queda pode ser gravada duas vezes, porque a
+deduplicação do validador é por processo.
+"""
+import os
+import signal
+import threading
+
+import main
+from spool import trava_arquivo
+
+
+def executa():
+    with main.app.app_context():
+        main.mybd.create_all()
+
+    # Guardada até o fim do processo: com dois exportadores o cursor de
+    # sheets_sync_state.json andaria para trás e linhas seriam reenviadas.
+    trava_sheets = None
+    if os.environ.get('SHEETS_EXPORTAR', '1') == '1':
+        trava_sheets = trava_arquivo(main.sheets_sync.estado_path + ".trava")
+    if trava_sheets is None:
+        print("Outro processo (ou máquina) exporta para o Google Sheets; este só grava no banco")
+        main.pipeline.exportar = None
+
+    main.start_mqtt(gravar=True, ao_vivo=False, grupo=os.environ.get('MQTT_GRUPO', 'medidor'))
+    recuperados = main.drena_spools_orfaos()
+    if recuperados:
+        print(f"{recuperados} registros recuperados de spools sem dono")
+
+    parar = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: parar.set())
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+    parar.wait()
+    main.stop_mqtt()
+    if trava_sheets is not None:
+        trava_sheets.close()
+
+
+if __name__ == '__main__':
+    executa()
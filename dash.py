@@ -1,22 +1,94 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from query import view_all_data
-import numpy as np
+from amostragem import JANELAS, linhas_reduzidas, recorta_janela, serie_longa, serie_reduzida
+from carregador import CarregadorIncremental
+from filtros import aplica_filtros, contagem_bins, contagem_histograma
+from query import (count_until, count_until_arrow, pool_stats, view_data_since, view_data_since_arrow,
+                   view_ids_until, view_ids_until_arrow, view_resumo, view_resumo_api, view_serie_api)
+import json
+import os
+import urllib.request
+from functools import partial
 
 
 st.set_page_config(page_title="Dashboard", page_icon="", layout="wide")
 
-@st.cache_data
-def load_data():
-    result = view_all_data()
-    df = pd.DataFrame(result, columns=["id", "temperatura", "pressao" , "altitude", "umidade", "co2", "tempo_registro"])
+API_URL = os.environ.get("API_URL", "http://localhost:5000")
+
+# "mysql": lê direto do banco; "api": lê da API em Arrow (/registro/exportar/arrow)
+DASH_FONTE = os.environ.get("DASH_FONTE", "mysql")
+
+@st.cache_resource
+def get_carregador():
+    # Compartilhado entre as sessões: guarda os dados e o último id já lido
+    if DASH_FONTE == "api":
+        return CarregadorIncremental(
+            partial(view_data_since_arrow, API_URL),
+            partial(count_until_arrow, API_URL),
+            partial(view_ids_until_arrow, API_URL),
+            ttl=30.0, intervalo_reconciliacao=300.0
+        )
+    return CarregadorIncremental(view_data_since, count_until, view_ids_until, ttl=30.0, intervalo_reconciliacao=300.0)
+
+def load_data(forcar=False):
+    carregador = get_carregador()
+    carregador.atualizar(forcar=forcar)
+    return carregador.dataframe()
+
+@st.cache_data(ttl=10)
+def load_resumo(dispositivo=None):
+    # Estatísticas e histogramas mantidos pelo backend a cada insert: uma
+    # chamada pequena, qualquer que seja o tamanho da tabela
+    if DASH_FONTE == "api":
+        return view_resumo_api(API_URL, dispositivo)
+    return view_resumo(dispositivo)
+
+@st.cache_data(ttl=10)
+def load_serie(pontos, dispositivo=None):
+    # Histórico inteiro reduzido na API: só os pontos do gráfico são transferidos
+    return serie_longa(view_serie_api(API_URL, pontos, dispositivo))
+
+atualizar = st.button("Atualizar Dados")
+if atualizar:
+    load_resumo.clear()
+    load_serie.clear()
+
+resumo_geral = load_resumo()
+
+st.sidebar.header("Dispositivo")
+
+dispositivo = st.sidebar.selectbox("Dispositivo", options=["Todos"] + resumo_geral["dispositivos"], index=0)
+resumo = resumo_geral["resumo"] if dispositivo == "Todos" else load_resumo(dispositivo)["resumo"]
+
+st.sidebar.header("Período")
+
+janela = st.sidebar.selectbox("Janela de tempo", options=list(JANELAS), index=3)
+
+def carrega_registros():
+    """Linhas brutas do dispositivo e da janela escolhidos; só usadas quando o usuário detalha."""
+    df = load_data(forcar=atualizar)
+    if dispositivo != "Todos":
+        df = df[df["dispositivo"].to_numpy() == dispositivo]
+    if janela == "Personalizado" and not df.empty:
+        datas = st.sidebar.date_input(
+            "Intervalo",
+            value=(df["tempo_registro"].min().date(), df["tempo_registro"].max().date())
+        )
+        if len(datas) == 2:
+            df = recorta_janela(df, pd.Timestamp(datas[0]), pd.Timestamp(datas[1]) + pd.Timedelta(days=1))
+    elif JANELAS[janela] is not None and not df.empty:
+        df = recorta_janela(df, df["tempo_registro"].max() - JANELAS[janela])
     return df
 
-df = load_data()
+# Com "Tudo" e sem filtros o dashboard sai só do resumo; uma janela de tempo
+# (ou um filtro estreitado, mais abaixo) carrega as linhas
+df = None
+if janela != "Tudo" or st.sidebar.checkbox("Carregar todos os registros", value=False):
+    df = carrega_registros()
 
-if st.button("Atualizar Dados"):
-    df = load_data()
+# Quantidade máxima de pontos por série nos gráficos de linha e dispersão
+pontos_grafico = st.sidebar.number_input("Pontos por gráfico", min_value=100, max_value=10000, value=1500, step=100)
 
 st.sidebar.header("Selecione a Informação para Gráficos")
 
@@ -37,93 +109,88 @@ def filtros(attribute):
 
 st.sidebar.header("Selecione o Filtro")
 
-if filtros("temperatura"):
+if filtros("temperatura") and "temperatura" in resumo:
     st.session_state.temperatura_range = st.sidebar.slider(
         "Temperatura (°C)",
-        min_value=float(df["temperatura"].min()),
-        max_value=float(df["temperatura"].max()),
-        value=(float(df["temperatura"].min()), float(df["temperatura"].max())),
+        min_value=resumo["temperatura"]["minimo"],
+        max_value=resumo["temperatura"]["maximo"],
+        value=(resumo["temperatura"]["minimo"], resumo["temperatura"]["maximo"]),
         step=0.1
     )
 
-if filtros("pressao"):
+if filtros("pressao") and "pressao" in resumo:
     st.session_state.pressao_range = st.sidebar.slider(
         "Pressão (hPa)",
-        min_value=float(df["pressao"].min()),
-        max_value=float(df["pressao"].max()),
-        value=(float(df["pressao"].min()), float(df["pressao"].max())),
+        min_value=resumo["pressao"]["minimo"],
+        max_value=resumo["pressao"]["maximo"],
+        value=(resumo["pressao"]["minimo"], resumo["pressao"]["maximo"]),
         step=0.1
     )
 
-if filtros("altitude"):
+if filtros("altitude") and "altitude" in resumo:
     st.session_state.altitude_range = st.sidebar.slider(
         "Altitude (m)",
-        min_value=float(df["altitude"].min()),
-        max_value=float(df["altitude"].max()),
-        value=(float(df["altitude"].min()), float(df["altitude"].max())),
+        min_value=resumo["altitude"]["minimo"],
+        max_value=resumo["altitude"]["maximo"],
+        value=(resumo["altitude"]["minimo"], resumo["altitude"]["maximo"]),
         step=1.0
     )
 
-if filtros("umidade"):
+if filtros("umidade") and "umidade" in resumo:
     st.session_state.umidade_range = st.sidebar.slider(
         "Umidade (%)",
-        min_value=float(df["umidade"].min()),
-        max_value=float(df["umidade"].max()),
-        value=(float(df["umidade"].min()), float(df["umidade"].max())),
+        min_value=resumo["umidade"]["minimo"],
+        max_value=resumo["umidade"]["maximo"],
+        value=(resumo["umidade"]["minimo"], resumo["umidade"]["maximo"]),
         step=0.1
     )
 
-if filtros("co2"):
+if filtros("co2") and "co2" in resumo:
     st.session_state.co2_range = st.sidebar.slider(
         "CO2 (ppm)",
-        min_value=float(df["co2"].min()),
-        max_value=float(df["co2"].max()),
-        value=(float(df["co2"].min()), float(df["co2"].max())),
+        min_value=resumo["co2"]["minimo"],
+        max_value=resumo["co2"]["maximo"],
+        value=(resumo["co2"]["minimo"], resumo["co2"]["maximo"]),
         step=1.0
     )
 
-df_selection = df.copy()
-if filtros("temperatura"):
-    df_selection = df_selection[
-        (df_selection["temperatura"] >= st.session_state.temperatura_range[0]) & 
-        (df_selection["temperatura"] <= st.session_state.temperatura_range[1])
-    ]
-
-if filtros("pressao"):
-    df_selection = df_selection[
-        (df_selection["pressao"] >= st.session_state.pressao_range[0]) & 
-        (df_selection["pressao"] <= st.session_state.pressao_range[1])
-    ]
-
-if filtros("altitude"):
-    df_selection = df_selection[
-        (df_selection["altitude"] >= st.session_state.altitude_range[0]) & 
-        (df_selection["altitude"] <= st.session_state.altitude_range[1])
-    ]
-
-if filtros("umidade"):
-    df_selection = df_selection[
-        (df_selection["umidade"] >= st.session_state.umidade_range[0]) & 
-        (df_selection["umidade"] <= st.session_state.umidade_range[1])
-    ]
-
-if filtros("co2"):
-    df_selection = df_selection[
-        (df_selection["co2"] >= st.session_state.co2_range[0]) & 
-        (df_selection["co2"] <= st.session_state.co2_range[1])
-    ]
+# Todas as faixas selecionadas são aplicadas de uma vez, com uma única máscara
+faixas = {
+    atributo: st.session_state[f"{atributo}_range"]
+    for atributo in ["temperatura", "pressao", "altitude", "umidade", "co2"]
+    if filtros(atributo) and atributo in resumo
+}
+# Um filtro estreitado precisa das linhas; com todos no máximo o resumo basta
+if df is None and any(tuple(faixa) != (resumo[atributo]["minimo"], resumo[atributo]["maximo"])
+                      for atributo, faixa in faixas.items()):
+    df = carrega_registros()
+# None: sem linhas carregadas, cards e distribuições vêm do resumo
+df_selection = None if df is None else aplica_filtros(df, faixas)
+
+MENSAGEM_DETALHE = "Escolha uma janela de tempo ou estreite um filtro para ver este gráfico."
+
+def sem_dados():
+    return not resumo if df_selection is None else df_selection.empty
+
+def medias():
+    colunas = ["umidade", "temperatura", "co2", "pressao"]
+    if df_selection is None:
+        return {coluna: resumo[coluna]["media"] if coluna in resumo else float("nan") for coluna in colunas}
+    return {coluna: df_selection[coluna].mean() for coluna in colunas}
 
 def Home():
-    with st.expander("Tabular"):
-        showData = st.multiselect('Filter: ', df_selection.columns, default=[], key="showData_home")
-        if showData:
-            st.write(df_selection[showData])
+    if df_selection is not None:
+        with st.expander("Tabular"):
+            showData = st.multiselect('Filter: ', df_selection.columns, default=[], key="showData_home")
+            if showData:
+                st.write(df_selection[showData])
         
-    if not df_selection.empty:
-        media_umidade = df_selection["umidade"].mean()
-        media_temperatura = df_selection["temperatura"].mean()
-        media_co2 = df_selection["co2"].mean()
-        media_pressao = df_selection["pressao"].mean()
+    if not sem_dados():
+        media = medias()
+        media_umidade = media["umidade"]
+        media_temperatura = media["temperatura"]
+        media_co2 = media["co2"]
+        media_pressao = media["pressao"]
 
         total1, total2, total3, total4 = st.columns(4, gap='large')
 
@@ -154,7 +221,7 @@ def graphs():
     
     with aba1:
         # Verifica se há dados disponíveis para gerar gráficos
-        if df_selection.empty:
+        if sem_dados():
             st.write("Nenhum dado disponível para gerar gráficos.")
             return
         
@@ -165,8 +232,12 @@ def graphs():
 
         # Criação de um gráfico de barras horizontal para mostrar a contagem de registros por uma variável selecionada
         try:
-            # Agrupa os dados pela variável escolhida para o eixo X e conta o número de registros em cada grupo
-            grouped_data = df_selection.groupby(by=[x_axis]).size().reset_index(name='contagem')
+            if df_selection is None:
+                # Sem linhas carregadas: contagem por faixa do histograma do resumo
+                grouped_data = contagem_histograma(resumo[x_axis]["histograma"], nome=x_axis)
+            else:
+                # Agrupa os dados pela variável escolhida para o eixo X e conta o número de registros em cada grupo
+                grouped_data = df_selection.groupby(by=[x_axis]).size().reset_index(name='contagem')
             fig_valores = px.bar(
                 grouped_data,
                 x=x_axis,
@@ -188,27 +259,32 @@ def graphs():
             fig_valores = None
         
         # Criação de um gráfico de linha para mostrar a média de uma variável em função de outra
-        try:
-            # Agrupa os dados pela variável escolhida para o eixo X e calcula a média da variável do eixo Y
-            grouped_data = df_selection.groupby(by=[x_axis]).agg({y_axis: 'mean'}).reset_index()
-            fig_state = px.line(
-                grouped_data,
-                x=x_axis,
-                y=y_axis,
-                title=f"<b>Média de {y_axis.capitalize()} por {x_axis.capitalize()}</b>",
-                color_discrete_sequence=["#0083b8"],  # Define a cor da linha
-                template="plotly_white"  # Define o tema do gráfico
-            )
-            
-            fig_state.update_layout(
-                xaxis=dict(showgrid=False),  # Remove as linhas de grade do eixo X
-                plot_bgcolor="rgba(0,0,0,0)",  # Define o fundo do gráfico como transparente
-                yaxis=dict(showgrid=False)   # Remove as linhas de grade do eixo Y
-            )
-        except Exception as e:
-            # Mostra uma mensagem de erro caso ocorra algum problema ao criar o gráfico
-            st.error(f"Erro ao criar o gráfico de linha: {e}")
+        if df_selection is None:
+            # A média de uma medida por faixa de outra precisa das linhas
+            st.info(MENSAGEM_DETALHE)
             fig_state = None
+        else:
+            try:
+                # Agrupa os dados pela variável escolhida para o eixo X e calcula a média da variável do eixo Y
+                grouped_data = df_selection.groupby(by=[x_axis]).agg({y_axis: 'mean'}).reset_index()
+                fig_state = px.line(
+                    grouped_data,
+                    x=x_axis,
+                    y=y_axis,
+                    title=f"<b>Média de {y_axis.capitalize()} por {x_axis.capitalize()}</b>",
+                    color_discrete_sequence=["#0083b8"],  # Define a cor da linha
+                    template="plotly_white"  # Define o tema do gráfico
+                )
+            
+                fig_state.update_layout(
+                    xaxis=dict(showgrid=False),  # Remove as linhas de grade do eixo X
+                    plot_bgcolor="rgba(0,0,0,0)",  # Define o fundo do gráfico como transparente
+                    yaxis=dict(showgrid=False)   # Remove as linhas de grade do eixo Y
+                )
+            except Exception as e:
+                # Mostra uma mensagem de erro caso ocorra algum problema ao criar o gráfico
+                st.error(f"Erro ao criar o gráfico de linha: {e}")
+                fig_state = None
         
         # Exibe os gráficos criados lado a lado em duas colunas
         left, right = st.columns(2)
@@ -220,61 +296,52 @@ def graphs():
                 st.plotly_chart(fig_valores, use_container_width=True)  # Exibe o gráfico de barras na coluna direita
 
     with aba2:
-        # Função para preparar os dados para o gráfico de linha geral
-        def prepare_chart_data(df, columns):
-            chart_data = pd.DataFrame()  # Cria um DataFrame vazio para armazenar os dados do gráfico
-            for column in columns:
-                if column in df.columns:
-                    # Cria um DataFrame temporário com os valores da coluna e uma coluna de "registro" para identificação
-                    temp_df = df[[column]].copy()
-                    temp_df['registro'] = column
-                    temp_df = temp_df.rename(columns={column: 'valor'})
-                    chart_data = pd.concat([chart_data, temp_df])  # Concatena os dados temporários ao DataFrame principal
-            return chart_data
-
         # Lista de colunas que serão incluídas no gráfico
         columns = ["temperatura", "umidade", "co2", "altitude", "pressao"]
-        chart_data = prepare_chart_data(df_selection, columns)
-
-        # Verifica se há dados para exibir
-        if not chart_data.empty:
-            # Cria um gráfico de linha para mostrar todos os registros gerais
-            fig = px.line(
-                chart_data,
-                y="valor",
-                color="registro",  # Diferencia as linhas no gráfico por cor
-                title="Registros Gerais",
-                labels={"valor": "Valor", "registro": "Tipo de Registro"}
-            )
-            fig.update_layout(
-                xaxis_title="Índice",  # Define o título do eixo X
-                yaxis_title="Valor",   # Define o título do eixo Y
-                plot_bgcolor="rgba(0,0,0,0)"  # Define o fundo do gráfico como transparente
-            )
-            st.plotly_chart(fig, use_container_width=True)  # Exibe o gráfico
+        if df_selection is None:
+            # Sem linhas carregadas: a API reduz o histórico inteiro (LTTB) no servidor
+            try:
+                chart_data = load_serie(pontos_grafico, None if dispositivo == "Todos" else dispositivo)
+            except OSError as e:
+                st.error(f"Erro ao carregar a série da API: {e}")
+                chart_data = None
         else:
-            st.write("Nenhum dado disponível para gerar gráficos.")
+            # Cada série é reduzida (LTTB) para no máximo `pontos_grafico` pontos
+            chart_data = serie_reduzida(df_selection, columns, pontos_grafico)
+
+        if chart_data is not None:
+            # Verifica se há dados para exibir
+            if not chart_data.empty:
+                # Cria um gráfico de linha para mostrar todos os registros gerais
+                fig = px.line(
+                    chart_data,
+                    x="tempo_registro",
+                    y="valor",
+                    color="registro",  # Diferencia as linhas no gráfico por cor
+                    title="Registros Gerais",
+                    labels={"valor": "Valor", "registro": "Tipo de Registro"}
+                )
+                fig.update_layout(
+                    xaxis_title="Tempo de Registro",  # Define o título do eixo X
+                    yaxis_title="Valor",   # Define o título do eixo Y
+                    plot_bgcolor="rgba(0,0,0,0)"  # Define o fundo do gráfico como transparente
+                )
+                st.plotly_chart(fig, use_container_width=True)  # Exibe o gráfico
+            else:
+                st.write("Nenhum dado disponível para gerar gráficos.")
             
     with aba3:
-        # Função para arredondar e agrupar dados em intervalos específicos
-        def group_data(df, column, interval=None):
-            if interval:
-                df[column] = (df[column] // interval * interval).astype(int)  # Agrupa em intervalos específicos
-            else:
-                df[column] = df[column].astype(int)  # Arredonda para inteiros
-            return df.groupby(by=column).size().reset_index(name='contagem')  # Conta a quantidade de registros em cada grupo
-
         # Lista de métricas para criar gráficos de pizza
         metrics = ['umidade', 'temperatura', 'co2', 'pressao', 'altitude']
         for metric in metrics:
-            if metric in df_selection.columns:
-                if metric in ['co2', 'pressao']:
-                    # Agrupa CO2 e Pressão em intervalos específicos de 1000
-                    pizza_data = group_data(df_selection, metric, interval=1000)
+            if metric in (resumo if df_selection is None else df_selection.columns):
+                # CO2 e Pressão em intervalos de 1000, as outras métricas arredondadas para inteiros
+                interval = 1000 if metric in ['co2', 'pressao'] else None
+                if df_selection is None:
+                    pizza_data = contagem_histograma(resumo[metric]["histograma"], interval, nome=metric)
                 else:
-                    # Arredonda outras métricas para inteiros
-                    pizza_data = group_data(df_selection, metric)
-                
+                    pizza_data = contagem_bins(df_selection[metric].to_numpy(), interval, nome=metric)
+
                 if not pizza_data.empty:
                     # Cria um gráfico de pizza para a métrica selecionada
                     fig_pizza = px.pie(
@@ -292,47 +359,87 @@ def graphs():
                     st.plotly_chart(fig_pizza, use_container_width=True)  # Exibe o gráfico de pizza
 
     with aba4:
-        # Prepara os dados para o gráfico de dispersão
-        scatter_data = df_selection.copy()
-
-        # Transforma o DataFrame para incluir uma coluna de "Variável" e valores "Valor"
-        melted_data = pd.melt(
-            scatter_data,
-            id_vars=['umidade'],  # Inclua uma coluna para colorir os pontos
-            value_vars=['temperatura', 'co2', 'altitude', 'pressao'],
-            var_name='Variável',
-            value_name='Valor'
-        )
-
-        # Verifica se há dados disponíveis para criar o gráfico
-        if not melted_data.empty:
-            # Cria um gráfico de dispersão com todas as variáveis, diferenciando por cor
-            fig_scatter = px.scatter(
-                melted_data,
-                x='Valor',
-                y='umidade',  # Usa 'umidade' como eixo Y para visualizar variação
-                color='Variável',  # Diferencia os pontos por cor baseada na variável
-                title="Dispersão de Variáveis com Cor Diferente",
-                labels={'Valor': 'Valor', 'umidade': 'Umidade (%)'},
-                color_discrete_map={  # Mapeia cores específicas para cada variável
-                    'temperatura': 'blue',
-                    'co2': 'red',
-                    'altitude': 'green',
-                    'pressao': 'orange'
-                }
+        if df_selection is None:
+            st.info(MENSAGEM_DETALHE)
+        else:
+            # Prepara os dados para o gráfico de dispersão
+            # Mantém os mínimos e máximos de umidade por intervalo de tempo, no máximo `pontos_grafico` linhas
+            scatter_data = linhas_reduzidas(df_selection, pontos_grafico, "umidade")
+
+            # Transforma o DataFrame para incluir uma coluna de "Variável" e valores "Valor"
+            melted_data = pd.melt(
+                scatter_data,
+                id_vars=['umidade'],  # Inclua uma coluna para colorir os pontos
+                value_vars=['temperatura', 'co2', 'altitude', 'pressao'],
+                var_name='Variável',
+                value_name='Valor'
             )
+
+            # Verifica se há dados disponíveis para criar o gráfico
+            if not melted_data.empty:
+                # Cria um gráfico de dispersão com todas as variáveis, diferenciando por cor
+                fig_scatter = px.scatter(
+                    melted_data,
+                    x='Valor',
+                    y='umidade',  # Usa 'umidade' como eixo Y para visualizar variação
+                    color='Variável',  # Diferencia os pontos por cor baseada na variável
+                    title="Dispersão de Variáveis com Cor Diferente",
+                    labels={'Valor': 'Valor', 'umidade': 'Umidade (%)'},
+                    color_discrete_map={  # Mapeia cores específicas para cada variável
+                        'temperatura': 'blue',
+                        'co2': 'red',
+                        'altitude': 'green',
+                        'pressao': 'orange'
+                    }
+                )
             
-            fig_scatter.update_layout(
-                xaxis_title='Valor',  # Define o título do eixo X
-                yaxis_title='Umidade (%)',  # Define o título do eixo Y
-                plot_bgcolor="rgba(0,0,0,0)",  # Define o fundo do gráfico como transparente
-                xaxis=dict(showgrid=False),  # Remove as linhas de grade do eixo X
-                yaxis=dict(showgrid=False)   # Remove as linhas de grade do eixo Y
-            )
-            st.plotly_chart(fig_scatter, use_container_width=True)  # Exibe o gráfico de dispersão
-        else:
-            st.write("Nenhum dado disponível para gerar gráficos.")
+                fig_scatter.update_layout(
+                    xaxis_title='Valor',  # Define o título do eixo X
+                    yaxis_title='Umidade (%)',  # Define o título do eixo Y
+                    plot_bgcolor="rgba(0,0,0,0)",  # Define o fundo do gráfico como transparente
+                    xaxis=dict(showgrid=False),  # Remove as linhas de grade do eixo X
+                    yaxis=dict(showgrid=False)   # Remove as linhas de grade do eixo Y
+                )
+                st.plotly_chart(fig_scatter, use_container_width=True)  # Exibe o gráfico de dispersão
+            else:
+                st.write("Nenhum dado disponível para gerar gráficos.")
+
+# Leituras ao vivo: long-poll no /data/poll da API; só este trecho é reexecutado
+
+def leituras_ao_vivo():
+    cursor = st.session_state.get("cursor_ao_vivo")
+    url = f"{API_URL}/data/poll?timeout=1" + (f"&cursor={cursor}" if cursor is not None else "")
+    try:
+        with urllib.request.urlopen(url, timeout=5) as resposta:
+            dados = json.load(resposta)
+    except (OSError, ValueError):
+        st.caption("API de leituras ao vivo indisponível.")
+        return
+
+    st.session_state.cursor_ao_vivo = dados["cursor"]
+    if dados["eventos"]:
+        st.session_state.ultima_ao_vivo = dados["eventos"][-1]
+
+    evento = st.session_state.get("ultima_ao_vivo")
+    if not evento or not isinstance(evento.get("leitura"), dict):
+        st.caption("Aguardando leituras...")
+        return
+    leitura = evento["leitura"]
+    colunas = st.columns(5)
+    for coluna, (rotulo, chave) in zip(colunas, [("Temperatura", "temperature"), ("Umidade", "humidity"),
+                                                 ("CO2", "CO2"), ("Pressão", "pressure"), ("Altitude", "altitude")]):
+        with coluna:
+            st.metric(label=rotulo, value=leitura.get(chave, "-"))
+    st.caption(f"Tópico: {evento.get('topico')}")
+
+if hasattr(st, "fragment"):
+    with st.expander("Ao vivo", expanded=True):
+        st.fragment(run_every=5)(leituras_ao_vivo)()
 
 # Chama a função para exibir os gráficos
 Home()
 graphs()
+
+if DASH_FONTE == "mysql":
+    with st.sidebar.expander("Pool de conexões"):
+        st.json(pool_stats())
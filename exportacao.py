@@ -0,0 +1,142 @@
+import csv
+import io
+from datetime import datetime
+
+# ********************* EXPORTAÇÃO COLUNAR (Parquet / Arrow / CSV) *********************************
+#
+# Os registros são lidos em páginas (keyset por id) e cada página vira um
+# row group (Parquet), um record batch (Arrow IPC stream) ou um bloco de
+# linhas (CSV), entregue ao cliente antes de ler a próxima: a memória fica
+# limitada ao tamanho da página, qualquer que seja o tamanho da tabela.
+# Parquet e Arrow precisam do pyarrow (opcional, pip install pyarrow).
+
+FORMATOS = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "csv": "text/csv"
+}
+
+
+def importa_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("Exportação em Parquet/Arrow requer o pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def formato_disponivel(formato):
+    """None se o formato pode ser gerado, senão a mensagem de erro."""
+    if formato not in FORMATOS:
+        return f"formato deve ser um de: {', '.join(FORMATOS)}"
+    if formato != "csv":
+        try:
+            importa_pyarrow()
+        except RuntimeError as e:
+            return str(e)
+    return None
+
+
+def schema_arrow(campos):
+    pa = importa_pyarrow()
+    tipos = {"id": pa.int64(), "dispositivo": pa.string(), "tempo_registro": pa.timestamp("us")}
+    return pa.schema([(campo, tipos.get(campo, pa.float64())) for campo in campos])
+
+
+def lote_arrow(schema, linhas, inicio=0):
+    """RecordBatch com as colunas das tuplas (a partir da posição `inicio`)."""
+    pa = importa_pyarrow()
+    colunas = list(zip(*linhas))[inicio:]
+    arrays = []
+    for campo, coluna in zip(schema, colunas):
+        if pa.types.is_floating(campo.type):
+            # Decimal (Numeric) é convertido pelo próprio Arrow, sem float() por valor.
+            # Passa por texto: o cast direto decimal -> double não arredonda
+            # corretamente (3.30 viraria 3.3000000000000003).
+            try:
+                array = pa.array(coluna)
+                if pa.types.is_decimal(array.type):
+                    array = array.cast(pa.string())
+                arrays.append(array.cast(campo.type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Decimal misturado com float (linhas do arquivo junto com as da tabela)
+                arrays.append(pa.array([None if v is None else float(v) for v in coluna], type=campo.type))
+        else:
+            arrays.append(pa.array(coluna, type=campo.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _Saida(io.RawIOBase):
+    """Arquivo em memória que o writer do pyarrow preenche e o gerador esvazia a cada página."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def retirar(self):
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.isoformat(" ", "seconds")
+    return valor
+
+
+def _csv(campos, paginas, inicio):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(campos)
+    for linhas in paginas:
+        escritor.writerows([_valor_csv(valor) for valor in linha[inicio:]] for linha in linhas)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _arrow(campos, paginas, inicio, formato):
+    pa = importa_pyarrow()
+    schema = schema_arrow(campos)
+    saida = _Saida()
+    if formato == "parquet":
+        import pyarrow.parquet as pq
+        escritor = pq.ParquetWriter(saida, schema, compression="snappy")
+        escrever = escritor.write_batch
+    else:
+        escritor = pa.ipc.new_stream(saida, schema)
+        escrever = escritor.write_batch
+    try:
+        for linhas in paginas:
+            escrever(lote_arrow(schema, linhas, inicio))
+            yield saida.retirar()
+    finally:
+        escritor.close()
+    yield saida.retirar()
+
+
+def exporta(campos, paginas, formato, inicio=0):
+    """Gera os bytes do arquivo no `formato` a partir de `paginas` (listas de tuplas).
+
+    Cada tupla tem as colunas de `campos` a partir da posição `inicio` (as
+    anteriores, como o id usado de cursor, são ignoradas).
+    """
+    if formato == "csv":
+        return _csv(campos, paginas, inicio)
+    return _arrow(campos, paginas, inicio, formato)
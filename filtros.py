@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# ********************* FILTROS E AGREGAÇÕES DO DASHBOARD *********************************
+
+
+def mascara_faixas(df, faixas):
+    """Máscara booleana única para todas as faixas {coluna: (minimo, maximo)}.
+
+    Trabalha direto nos arrays NumPy das colunas, reaproveitando o mesmo
+    buffer temporário para cada comparação.
+    """
+    mascara = np.ones(len(df), dtype=bool)
+    temporario = np.empty(len(df), dtype=bool)
+    for coluna, (minimo, maximo) in faixas.items():
+        valores = df[coluna].to_numpy()
+        np.greater_equal(valores, minimo, out=temporario)
+        mascara &= temporario
+        np.less_equal(valores, maximo, out=temporario)
+        mascara &= temporario
+    return mascara
+
+
+def aplica_filtros(df, faixas):
+    """Aplica todas as faixas de uma vez.
+
+    Sem filtros (ou quando nenhuma linha é excluída) devolve o próprio
+    DataFrame, sem cópia; caso contrário faz uma única seleção.
+    """
+    if not faixas or df.empty:
+        return df
+    mascara = mascara_faixas(df, faixas)
+    if mascara.all():
+        return df
+    return df[mascara]
+
+
+def contagem_bins(valores, intervalo=None, nome="valor"):
+    """Contagem por faixa: `intervalo` fixo (ex. 1000) ou parte inteira do valor.
+
+    Equivale a arredondar a coluna e fazer groupby().size(), mas sem alterar
+    o DataFrame e usando np.bincount.
+    """
+    valores = np.asarray(valores, dtype="float64")
+    valores = valores[~np.isnan(valores)]
+    if valores.size == 0:
+        return pd.DataFrame({nome: np.empty(0, dtype="int64"), "contagem": np.empty(0, dtype="int64")})
+
+    if intervalo:
+        bins = np.floor_divide(valores, intervalo).astype("int64")
+    else:
+        bins = valores.astype("int64")  # trunca como astype(int)
+    deslocamento = bins.min()
+    contagens = np.bincount(bins - deslocamento)
+    presentes = np.flatnonzero(contagens)
+    rotulos = presentes + deslocamento
+    if intervalo:
+        rotulos = rotulos * int(intervalo)
+    return pd.DataFrame({nome: rotulos, "contagem": contagens[presentes]})
+
+
+def contagem_histograma(histograma, intervalo=None, nome="valor"):
+    """Contagem por faixa a partir de um histograma do resumo ({"largura", "faixas": [[inicio, contagem]]}).
+
+    Mesmo formato de contagem_bins. `intervalo` (múltiplo da largura do
+    histograma) junta as faixas; sem ele ficam as faixas do histograma.
+    """
+    faixas = np.asarray(histograma["faixas"], dtype="float64").reshape(-1, 2)
+    if faixas.shape[0] == 0:
+        return pd.DataFrame({nome: np.empty(0, dtype="int64"), "contagem": np.empty(0, dtype="int64")})
+    largura = intervalo or histograma["largura"]
+    # As faixas do histograma são múltiplos exatos da largura; o arredondamento só absorve erro de ponto flutuante
+    bins = np.floor(np.round(faixas[:, 0] / largura, 6)).astype("int64")
+    rotulos, posicoes = np.unique(bins, return_inverse=True)
+    contagens = np.bincount(posicoes, weights=faixas[:, 1]).astype("int64")
+    valores = rotulos * largura
+    if float(largura).is_integer():
+        valores = valores.astype("int64")
+    return pd.DataFrame({nome: valores, "contagem": contagens})
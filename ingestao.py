@@ -0,0 +1,354 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from spool import SpoolCheio
+
+# ********************* PAYLOADS MQTT *********************************
+
+# Todos os grupos/placas publicam em MQTT_PREFIXO/<dispositivo>
+MQTT_PREFIXO = os.environ.get('MQTT_PREFIXO', "projeto_integrado/SENAI134/Cienciadedados")
+MQTT_TOPICO = os.environ.get('MQTT_TOPICO', MQTT_PREFIXO + "/+")
+
+
+def dispositivo_do_topico(topico):
+    """Id do dispositivo: o trecho do tópico depois do prefixo (ex.: 'GrupoX')."""
+    if topico.startswith(MQTT_PREFIXO + "/"):
+        return topico[len(MQTT_PREFIXO) + 1:]
+    return topico
+
+
+# ********************* ITENS DO SPOOL *********************************
+#
+# O spool guarda bytes: uma mensagem MQTT crua (decodificada e validada só
+# na drenagem, fora da thread do paho) ou uma linha da API já validada.
+
+
+def codifica_mensagem(topico, payload):
+    # U+0000 não pode aparecer em tópicos MQTT, então separa tópico e payload
+    return b"m" + topico.encode("utf-8") + b"\0" + bytes(payload)
+
+
+def codifica_linha(linha):
+    return b"a" + json.dumps(dict(linha, tempo_registro=linha["tempo_registro"].isoformat())).encode("utf-8")
+
+
+def decodifica_item(item):
+    """("mqtt", tópico, payload) ou ("api", linha) de um item do spool."""
+    if item[:1] == b"m":
+        topico, _, payload = item[1:].partition(b"\0")
+        return "mqtt", topico.decode("utf-8"), payload
+    if item[:1] == b"a":
+        linha = json.loads(item[1:])
+        linha["tempo_registro"] = datetime.fromisoformat(linha["tempo_registro"])
+        return "api", linha
+    raise ValueError(f"item do spool desconhecido: {item[:20]!r}")
+
+
+# ********************* PIPELINE DE INGESTÃO *********************************
+
+_PARAR = object()
+
+
+class PipelineIngestao:
+    """Desacopla o recebimento das mensagens MQTT da gravação no banco.
+
+    O callback do paho só chama `enfileirar`, que coloca a mensagem em uma
+    fila limitada. Uma thread de trabalho junta as mensagens em lotes (até
+    `tamanho_lote` itens ou `intervalo_lote` segundos), entrega cada lote a
+    `persistir(lote)` — um insert em massa e um commit. `exportar()` roda em
+    outra thread, a cada `intervalo_exportacao` segundos quando houve dados
+    novos: a espera do balde de tokens e o backoff do Sheets não seguram a
+    gravação no banco.
+
+    Com um `spool` (SpoolIngestao) a fila em memória dá lugar ao disco:
+    `enfileirar` acrescenta o item (bytes) ao spool e a thread de trabalho
+    drena o spool em lotes, gravando o checkpoint depois de cada lote
+    persistido. Se `persistir` falha o lote fica no spool e é tentado de
+    novo com espera crescente (até `espera_max_erro` segundos), então nada
+    se perde enquanto o banco está fora. Depois de `tentativas_lote` falhas
+    seguidas com o banco respondendo (`verificar()` não levanta), o lote é
+    dividido ao meio até isolar o item recusado, que vai para a quarentena
+    do spool; assim um item ruim não trava a ingestão. `recuperando` indica que o lote em
+    gravação foi escrito antes deste processo abrir o spool (pode já ter
+    chegado ao banco antes de uma queda).
+    """
+
+    def __init__(self, persistir, exportar=None, tamanho_fila=10000, tamanho_lote=500,
+                 intervalo_lote=1.0, intervalo_exportacao=10.0, espera_fila_cheia=0.1,
+                 spool=None, espera_max_erro=30.0, tentativas_lote=3, verificar=None):
+        self.persistir = persistir
+        self.exportar = exportar
+        self.fila = queue.Queue(maxsize=tamanho_fila)
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_lote = intervalo_lote
+        self.intervalo_exportacao = intervalo_exportacao
+        self.espera_fila_cheia = espera_fila_cheia
+        self.spool = spool
+        self.espera_max_erro = espera_max_erro
+        self.tentativas_lote = tentativas_lote
+        self.verificar = verificar
+        self.recuperando = False
+        self._novos = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+        self._thread_exportacao = None
+        self._parar_exportacao = threading.Event()
+        self._lock = threading.Lock()
+        self._pendente_exportacao = False
+
+        # Métricas
+        self.recebidos = 0
+        self.descartados = 0
+        self.gravados = 0
+        self.lotes = 0
+        self.erros_lote = 0
+        self.quarentenados = 0
+        self.exportacoes = 0
+        self.erros_exportacao = 0
+        self.ultimo_lote = 0
+        self.maior_lote = 0
+        self.ultima_latencia = 0.0
+        self.maior_latencia = 0.0
+        self.latencia_total = 0.0
+        self.maior_fila = 0
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            if self.spool is not None:
+                self.spool.abrir()
+            self._parar.clear()
+            alvo = self._executar if self.spool is None else self._drenar
+            self._thread = threading.Thread(target=alvo, name='ingestao', daemon=True)
+            self._thread.start()
+        if self.exportar is not None and (self._thread_exportacao is None or not self._thread_exportacao.is_alive()):
+            self._parar_exportacao.clear()
+            self._thread_exportacao = threading.Thread(target=self._executar_exportacao, name='exportacao', daemon=True)
+            self._thread_exportacao.start()
+
+    def enfileirar(self, item, duravel=False):
+        """Coloca a mensagem na fila. Retorna False se a fila continuar cheia (mensagem descartada).
+
+        Com spool, `duravel=True` só retorna depois do fsync que cobre o item.
+        """
+        if self.spool is not None:
+            return self._enfileirar_spool(item, duravel)
+        try:
+            self.fila.put(item, timeout=self.espera_fila_cheia)
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+            return False
+        with self._lock:
+            self.recebidos += 1
+            self.maior_fila = max(self.maior_fila, self.fila.qsize())
+        return True
+
+    def _enfileirar_spool(self, item, duravel):
+        try:
+            self.spool.acrescentar([item], duravel=duravel)
+        except (SpoolCheio, OSError) as e:
+            print(f"Spool indisponível, mensagem descartada: {str(e)}")
+            with self._lock:
+                self.descartados += 1
+            return False
+        with self._lock:
+            self.recebidos += 1
+        self._novos.set()
+        return True
+
+    def parar(self, timeout=30.0):
+        """Grava o que ainda está na fila, faz a última exportação e encerra a thread.
+
+        Com spool, o que não couber em `timeout` continua no disco para a próxima execução.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            if self.spool is None:
+                self.fila.put(_PARAR)
+            else:
+                self._parar.set()
+                self._novos.set()
+            self._thread.join(timeout)
+            if self.spool is not None and not self._thread.is_alive():
+                self.spool.fechar()
+        # Depois da gravação: a última exportação leva o que acabou de entrar no banco
+        if self._thread_exportacao is not None and self._thread_exportacao.is_alive():
+            self._parar_exportacao.set()
+            self._thread_exportacao.join(timeout)
+
+    def pendentes(self):
+        return self.fila.qsize() if self.spool is None else self.spool.metricas()["pendentes"]
+
+    # ---------------- thread de trabalho ----------------
+
+    def _executar(self):
+        parar = False
+        while not parar:
+            lote, parar = self._montar_lote()
+            if lote:
+                self._gravar(lote)
+
+    def _montar_lote(self):
+        lote = []
+        item = self.fila.get()
+        if item is _PARAR:
+            return lote, True
+        lote.append(item)
+
+        limite = time.monotonic() + self.intervalo_lote
+        while len(lote) < self.tamanho_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                item = self.fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            if item is _PARAR:
+                return lote, True
+            lote.append(item)
+        return lote, False
+
+    def _drenar(self):
+        cursor = self.spool.checkpoint
+        espera_erro = 0.0
+        falhas = 0
+        # Enquanto um lote que falhou está sendo dividido, os lotes têm no
+        # máximo `limite_lote` itens até o cursor passar de `fim_suspeito`
+        limite_lote = self.tamanho_lote
+        fim_suspeito = None
+        while True:
+            if fim_suspeito is not None and cursor >= fim_suspeito:
+                limite_lote, fim_suspeito = self.tamanho_lote, None
+            # Limpa antes de ler: o que chegar depois da leitura acorda a espera
+            self._novos.clear()
+            lote, proximo = self.spool.ler(cursor, limite_lote)
+            if lote and len(lote) < limite_lote and fim_suspeito is None and not self._parar.is_set():
+                # Espera o lote encher por até intervalo_lote
+                limite = time.monotonic() + self.intervalo_lote
+                while len(lote) < limite_lote and time.monotonic() < limite:
+                    self._novos.clear()
+                    mais, proximo_mais = self.spool.ler(proximo, limite_lote - len(lote))
+                    if mais:
+                        lote.extend(mais)
+                        proximo = proximo_mais
+                    elif self._novos.wait(limite - time.monotonic()) and self._parar.is_set():
+                        break
+
+            if lote:
+                self.recuperando = self.spool.da_sessao_anterior(cursor)
+                if self._gravar(lote):
+                    self.spool.confirmar(proximo, lote)
+                    cursor = proximo
+                    espera_erro = 0.0
+                    falhas = 0
+                else:
+                    falhas += 1
+                    # Já dividindo, uma falha basta: o banco respondeu há pouco
+                    if falhas >= (1 if fim_suspeito is not None else self.tentativas_lote) and self._banco_disponivel():
+                        falhas = 0
+                        espera_erro = 0.0
+                        if len(lote) == 1:
+                            print(f"Item recusado pelo banco movido para a quarentena do spool: {lote[0][:200]!r}")
+                            self.spool.quarentena(lote)
+                            self.spool.confirmar(proximo, lote)
+                            cursor = proximo
+                            with self._lock:
+                                self.quarentenados += 1
+                        else:
+                            if fim_suspeito is None:
+                                fim_suspeito = proximo
+                            limite_lote = len(lote) // 2
+                        continue
+                    # O lote continua no spool; tenta de novo depois de esperar
+                    espera_erro = min(max(2 * espera_erro, 0.5), self.espera_max_erro)
+                    if self._parar.wait(espera_erro):
+                        break
+                    continue
+
+            if self._parar.is_set() and not lote:
+                break
+            if not lote:
+                self._novos.wait()
+
+    def _banco_disponivel(self):
+        """Sem `verificar`, falhas repetidas são sempre atribuídas ao lote."""
+        if self.verificar is None:
+            return True
+        try:
+            self.verificar()
+        except Exception as e:
+            print(f"Banco indisponível: {str(e)}")
+            return False
+        return True
+
+    def _gravar(self, lote):
+        inicio = time.perf_counter()
+        try:
+            gravados = self.persistir(lote)
+        except Exception as e:
+            print(f"Erro ao gravar lote de {len(lote)} mensagens: {str(e)}")
+            with self._lock:
+                self.erros_lote += 1
+            return False
+        latencia = time.perf_counter() - inicio
+        with self._lock:
+            self.lotes += 1
+            self.gravados += gravados if gravados is not None else len(lote)
+            self.ultimo_lote = len(lote)
+            self.maior_lote = max(self.maior_lote, len(lote))
+            self.ultima_latencia = latencia
+            self.maior_latencia = max(self.maior_latencia, latencia)
+            self.latencia_total += latencia
+            self._pendente_exportacao = True
+        return True
+
+    # ---------------- thread de exportação ----------------
+
+    def _executar_exportacao(self):
+        while not self._parar_exportacao.wait(self.intervalo_exportacao):
+            self._exportar()
+        self._exportar()
+
+    def _exportar(self):
+        with self._lock:
+            if self.exportar is None or not self._pendente_exportacao:
+                return
+            self._pendente_exportacao = False
+        try:
+            self.exportar()
+            with self._lock:
+                self.exportacoes += 1
+        except Exception as e:
+            print(f"Erro ao exportar dados: {str(e)}")
+            with self._lock:
+                self.erros_exportacao += 1
+                self._pendente_exportacao = True
+
+    def metricas(self):
+        with self._lock:
+            metricas = {
+                "fila": self.pendentes(),
+                "capacidade_fila": self.fila.maxsize,
+                "maior_fila": self.maior_fila,
+                "recebidos": self.recebidos,
+                "descartados": self.descartados,
+                "gravados": self.gravados,
+                "lotes": self.lotes,
+                "erros_lote": self.erros_lote,
+                "quarentenados": self.quarentenados,
+                "ultimo_lote": self.ultimo_lote,
+                "maior_lote": self.maior_lote,
+                "media_lote": self.gravados / self.lotes if self.lotes else 0.0,
+                "ultima_latencia_s": self.ultima_latencia,
+                "maior_latencia_s": self.maior_latencia,
+                "media_latencia_s": self.latencia_total / self.lotes if self.lotes else 0.0,
+                "exportacoes": self.exportacoes,
+                "erros_exportacao": self.erros_exportacao
+            }
+        if self.spool is not None:
+            metricas["spool"] = self.spool.metricas()
+        return metricas
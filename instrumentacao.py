@@ -0,0 +1,205 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# ********************* INSTRUMENTAÇÃO (formato de texto do Prometheus) *********************************
+#
+# Contadores e histogramas em memória, atualizados nos pontos quentes da
+# ingestão e da API e expostos em /metrics. Cada métrica guarda uma série por
+# combinação de rótulos; os rótulos são passados por posição, na ordem dada
+# na criação:
+#
+#   decodificacao = instrumentos.histograma("decodificacao_json_segundos", "...", ("origem",))
+#   decodificacao.observar(0.0002, "mqtt")
+#   with db_escrita.medir("api"):
+#       ...
+
+# Limites dos buckets em segundos: de 0,5 ms a 10 s
+LIMITES_PADRAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapa(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos(nomes, valores, extra=""):
+    pares = [f'{nome}="{_escapa(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        # Sem rótulos a série existe desde o início (aparece como 0 em /metrics)
+        self._series = {} if self.rotulos else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, valor=1, *rotulos):
+        with self._lock:
+            self._series[rotulos] = self._series.get(rotulos, 0) + valor
+
+    def valor(self, *rotulos):
+        with self._lock:
+            return self._series.get(rotulos, 0)
+
+    def linhas(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        for rotulos, valor in series:
+            yield f"{self.nome}{_rotulos(self.rotulos, rotulos)} {_numero(valor)}"
+
+
+class Histograma:
+    """Histograma de buckets fixos; cada observação é um bisect e três somas sob um lock."""
+
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.limites = tuple(sorted(limites))
+        # rótulos -> [contagens por bucket (não acumuladas, a última é +Inf), soma, total]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *rotulos):
+        indice = bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                serie = self._series[rotulos] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    @contextmanager
+    def medir(self, *rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, *rotulos)
+
+    def total(self, *rotulos):
+        with self._lock:
+            serie = self._series.get(rotulos)
+            return serie[2] if serie else 0
+
+    def linhas(self):
+        with self._lock:
+            series = sorted((rotulos, (list(contagens), soma, total))
+                            for rotulos, (contagens, soma, total) in self._series.items())
+        for rotulos, (contagens, soma, total) in series:
+            acumulado = 0
+            for limite, contagem in zip(self.limites + (float("inf"),), contagens):
+                acumulado += contagem
+                extra = f'le="{_numero(limite)}"'
+                yield f"{self.nome}_bucket{_rotulos(self.rotulos, rotulos, extra)} {acumulado}"
+            yield f"{self.nome}_sum{_rotulos(self.rotulos, rotulos)} {_numero(soma)}"
+            yield f"{self.nome}_count{_rotulos(self.rotulos, rotulos)} {total}"
+
+
+class Medidor:
+    """Valor lido na hora da coleta (tamanho de fila, atraso da planilha...)."""
+
+    tipo = "gauge"
+
+    def __init__(self, nome, ajuda, funcao):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.funcao = funcao
+
+    def linhas(self):
+        try:
+            valor = self.funcao()
+        except Exception as e:
+            print(f"Erro ao coletar {self.nome}: {str(e)}")
+            return
+        if valor is not None:
+            yield f"{self.nome} {_numero(valor)}"
+
+
+class Instrumentos:
+    """Conjunto de métricas de um processo, com o `prefixo` aplicado a todos os nomes."""
+
+    def __init__(self, prefixo="medidor_"):
+        self.prefixo = prefixo
+        self._metricas = []
+
+    def _adiciona(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._adiciona(Contador(self.prefixo + nome, ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        return self._adiciona(Histograma(self.prefixo + nome, ajuda, rotulos, limites))
+
+    def medidor(self, nome, ajuda, funcao):
+        return self._adiciona(Medidor(self.prefixo + nome, ajuda, funcao))
+
+    def texto(self):
+        """Exposição no formato de texto 0.0.4 do Prometheus."""
+        saida = []
+        for metrica in self._metricas:
+            saida.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            saida.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            saida.extend(metrica.linhas())
+        return "\n".join(saida) + "\n"
+
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ********************* CONSULTAS LENTAS *********************************
+
+
+def registra_consultas_lentas(limite_s, amostragem=1.0, histograma=None, alvo=None, aleatorio=random.random):
+    """Mede cada comando SQL pelos eventos do SQLAlchemy e loga os lentos.
+
+    Substitui o SQLALCHEMY_ECHO: nada é impresso para comandos abaixo de
+    `limite_s` segundos e, acima dele, só uma fração `amostragem` é logada.
+    Se `histograma` for dado, toda duração é observada nele com o rótulo da
+    operação (SELECT, INSERT...). `alvo` é um Engine ou a classe Engine (todos).
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    alvo = Engine if alvo is None else alvo
+
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._inicio_consulta = time.perf_counter()
+
+    def depois(conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, "_inicio_consulta", None)
+        if inicio is None:
+            return
+        duracao = time.perf_counter() - inicio
+        if histograma is not None:
+            histograma.observar(duracao, statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "")
+        if duracao >= limite_s and aleatorio() < amostragem:
+            if executemany:
+                parametros = f"[{len(parameters)} conjuntos de parâmetros]"
+            else:
+                parametros = repr(parameters)[:200]
+            print(f"Consulta lenta ({duracao * 1000:.1f} ms): {' '.join(statement.split())[:500]} {parametros}")
+
+    event.listen(alvo, "before_cursor_execute", antes)
+    event.listen(alvo, "after_cursor_execute", depois)
+    return antes, depois
@@ -0,0 +1,165 @@
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# ********************* MODELOS *********************************
+#
+# Compartilhados pela API (main.py) e pelo modo assíncrono (main_async.py);
+# importar este módulo não abre conexão nenhuma.
+
+mybd = SQLAlchemy()
+
+class Registro(mybd.Model):
+    __tablename__ = 'registro'
+    id = mybd.Column(mybd.Integer, primary_key=True, autoincrement=True)
+    dispositivo = mybd.Column(mybd.String(64))
+    temperatura = mybd.Column(mybd.Numeric(10, 2))
+    pressao = mybd.Column(mybd.Numeric(10, 2))
+    altitude = mybd.Column(mybd.Numeric(10, 2))
+    umidade = mybd.Column(mybd.Numeric(10, 2))
+    co2 = mybd.Column(mybd.Numeric(10, 2))
+    tempo_registro = mybd.Column(mybd.DateTime)
+
+    __table_args__ = (
+        # Chave de deduplicação: barra a linha repetida que dois processos
+        # gravariam ao mesmo tempo (o filtro de chaves_existentes vem antes do
+        # insert). Dispositivo NULL não colide. Bancos já criados:
+        #   ALTER TABLE registro DROP INDEX ix_registro_dispositivo_tempo,
+        #     ADD UNIQUE INDEX ix_registro_dispositivo_tempo (dispositivo, tempo_registro)
+        mybd.Index('ix_registro_dispositivo_tempo', 'dispositivo', 'tempo_registro', unique=True),
+        # Paginação por id de um dispositivo (/registro?dispositivo=, exportação)
+        mybd.Index('ix_registro_dispositivo_id', 'dispositivo', 'id'),
+        # Filtro de exportação (predicado.py) com intervalo de tempo estreito. Os
+        # limites de medida (co2 > 20) não têm índice: a consulta anda pela chave
+        # primária (id > ? ORDER BY id) e um índice neles só custaria nos inserts.
+        mybd.Index('ix_registro_tempo', 'tempo_registro'),
+    )
+
+    def to_json(self):
+        return {
+            "id": self.id,
+            "dispositivo": self.dispositivo,
+            "temperatura": float(self.temperatura),
+            "pressao": float(self.pressao),
+            "altitude": float(self.altitude),
+            "umidade": float(self.umidade),
+            "co2": float(self.co2),
+            "tempo_registro": self.tempo_registro.strftime('%Y-%m-%d %H:%M:%S') if self.tempo_registro else None
+        }
+
+class RegistroRollup(mybd.Model):
+    """Acumuladores por intervalo (minuto/hora/dia) de cada medida."""
+    __tablename__ = 'registro_rollup'
+    granularidade = mybd.Column(mybd.String(10), primary_key=True)
+    medida = mybd.Column(mybd.String(20), primary_key=True)
+    bucket = mybd.Column(mybd.DateTime, primary_key=True)
+    dispositivo = mybd.Column(mybd.String(64), primary_key=True, default='')
+    contagem = mybd.Column(mybd.Integer, nullable=False)
+    soma = mybd.Column(mybd.Float, nullable=False)
+    minimo = mybd.Column(mybd.Float, nullable=False)
+    maximo = mybd.Column(mybd.Float, nullable=False)
+    soma_quadrados = mybd.Column(mybd.Float, nullable=False)
+
+def valores_rollup(agregados):
+    """Parâmetros do upsert a partir do resultado de rollup.agrega_linhas."""
+    return [
+        {
+            "granularidade": granularidade,
+            "bucket": bucket,
+            "medida": medida,
+            "dispositivo": dispositivo,
+            "contagem": a[0],
+            "soma": a[1],
+            "minimo": a[2],
+            "maximo": a[3],
+            "soma_quadrados": a[4]
+        }
+        for (granularidade, bucket, medida, dispositivo), a in agregados.items()
+    ]
+
+class RegistroResumo(mybd.Model):
+    """Acumuladores de todo o histórico (inclusive o arquivado) de cada medida, por dispositivo."""
+    __tablename__ = 'registro_resumo'
+    medida = mybd.Column(mybd.String(20), primary_key=True)
+    dispositivo = mybd.Column(mybd.String(64), primary_key=True, default='')
+    contagem = mybd.Column(mybd.Integer, nullable=False)
+    soma = mybd.Column(mybd.Float, nullable=False)
+    minimo = mybd.Column(mybd.Float, nullable=False)
+    maximo = mybd.Column(mybd.Float, nullable=False)
+    soma_quadrados = mybd.Column(mybd.Float, nullable=False)
+
+class RegistroHistograma(mybd.Model):
+    """Contagem por faixa de largura fixa (rollup.LARGURAS_HISTOGRAMA) de cada medida, por dispositivo."""
+    __tablename__ = 'registro_histograma'
+    medida = mybd.Column(mybd.String(20), primary_key=True)
+    dispositivo = mybd.Column(mybd.String(64), primary_key=True, default='')
+    # Índice da faixa: floor(valor / largura)
+    faixa = mybd.Column(mybd.Integer, primary_key=True, autoincrement=False)
+    contagem = mybd.Column(mybd.Integer, nullable=False)
+
+def valores_resumo(resumo):
+    """Parâmetros do upsert a partir do resultado de rollup.agrega_resumo."""
+    return [
+        {
+            "medida": medida,
+            "dispositivo": dispositivo,
+            "contagem": a[0],
+            "soma": a[1],
+            "minimo": a[2],
+            "maximo": a[3],
+            "soma_quadrados": a[4]
+        }
+        for (medida, dispositivo), a in resumo.items()
+    ]
+
+def valores_histograma(contagens):
+    """Parâmetros do upsert a partir do resultado de rollup.agrega_histograma."""
+    return [
+        {"medida": medida, "dispositivo": dispositivo, "faixa": faixa, "contagem": contagem}
+        for (medida, dispositivo, faixa), contagem in contagens.items()
+    ]
+
+def _stmt_upsert_acumuladores(tabela, chaves, dialeto):
+    """INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT no SQLite) que soma os acumuladores."""
+    if dialeto == 'sqlite':
+        # SQLite é usado em testes locais e benchmarks
+        stmt = sqlite_insert(tabela)
+        novo = stmt.excluded
+        return stmt.on_conflict_do_update(
+            index_elements=chaves,
+            set_={
+                "contagem": tabela.c.contagem + novo.contagem,
+                "soma": tabela.c.soma + novo.soma,
+                "minimo": func.min(tabela.c.minimo, novo.minimo),
+                "maximo": func.max(tabela.c.maximo, novo.maximo),
+                "soma_quadrados": tabela.c.soma_quadrados + novo.soma_quadrados
+            }
+        )
+    stmt = mysql_insert(tabela)
+    novo = stmt.inserted
+    return stmt.on_duplicate_key_update(
+        contagem=tabela.c.contagem + novo.contagem,
+        soma=tabela.c.soma + novo.soma,
+        minimo=func.least(tabela.c.minimo, novo.minimo),
+        maximo=func.greatest(tabela.c.maximo, novo.maximo),
+        soma_quadrados=tabela.c.soma_quadrados + novo.soma_quadrados
+    )
+
+def stmt_upsert_rollups(dialeto):
+    return _stmt_upsert_acumuladores(RegistroRollup.__table__, ["granularidade", "medida", "bucket", "dispositivo"], dialeto)
+
+def stmt_upsert_resumo(dialeto):
+    return _stmt_upsert_acumuladores(RegistroResumo.__table__, ["medida", "dispositivo"], dialeto)
+
+def stmt_upsert_histograma(dialeto):
+    """Soma as contagens (negativas ao deletar) nas faixas existentes."""
+    tabela = RegistroHistograma.__table__
+    if dialeto == 'sqlite':
+        stmt = sqlite_insert(tabela)
+        return stmt.on_conflict_do_update(
+            index_elements=["medida", "dispositivo", "faixa"],
+            set_={"contagem": tabela.c.contagem + stmt.excluded.contagem}
+        )
+    stmt = mysql_insert(tabela)
+    return stmt.on_duplicate_key_update(contagem=tabela.c.contagem + stmt.inserted.contagem)
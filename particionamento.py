@@ -0,0 +1,54 @@
+from datetime import date
+
+# ********************* PARTICIONAMENTO DA TABELA REGISTRO (MySQL) *********************************
+#
+# Particiona `registro` por mês com RANGE (TO_DAYS(tempo_registro)). O MySQL
+# exige que a coluna de partição faça parte de todas as chaves únicas, então a
+# chave primária passa a ser (id, tempo_registro) e tempo_registro fica NOT NULL.
+# Consultas com filtro de tempo só leem as partições do intervalo.
+
+
+def _proximo_mes(dia):
+    return date(dia.year + (dia.month == 12), dia.month % 12 + 1, 1)
+
+
+def _meses(inicio, quantidade):
+    mes = date(inicio.year, inicio.month, 1)
+    for _ in range(quantidade):
+        proximo = _proximo_mes(mes)
+        yield mes, proximo
+        mes = proximo
+
+
+def _particao(mes, limite):
+    return f"PARTITION p{mes:%Y%m} VALUES LESS THAN (TO_DAYS('{limite:%Y-%m-%d}'))"
+
+
+def sql_particionar(inicio, meses, tabela='registro'):
+    """Comandos para converter a tabela em particionada, com `meses` partições a partir de `inicio`."""
+    particoes = [_particao(mes, limite) for mes, limite in _meses(inicio, meses)]
+    particoes.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return [
+        f"ALTER TABLE {tabela} MODIFY tempo_registro DATETIME NOT NULL",
+        f"ALTER TABLE {tabela} DROP PRIMARY KEY, ADD PRIMARY KEY (id, tempo_registro)",
+        f"ALTER TABLE {tabela} PARTITION BY RANGE (TO_DAYS(tempo_registro)) (\n    "
+        + ",\n    ".join(particoes) + "\n)"
+    ]
+
+
+def sql_adicionar_particoes(ultimo_mes, meses, tabela='registro'):
+    """Divide a partição pmax criando `meses` partições depois de `ultimo_mes` (já existente)."""
+    particoes = [_particao(mes, limite) for mes, limite in _meses(_proximo_mes(ultimo_mes), meses)]
+    particoes.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return [
+        f"ALTER TABLE {tabela} REORGANIZE PARTITION pmax INTO (\n    " + ",\n    ".join(particoes) + "\n)"
+    ]
+
+
+def ultimo_mes_particionado(nomes_particoes):
+    """Mês da última partição mensal (nomes no formato pAAAAMM), ou None."""
+    meses = [nome for nome in nomes_particoes if nome and nome.startswith('p') and nome[1:].isdigit()]
+    if not meses:
+        return None
+    ultimo = max(meses)
+    return date(int(ultimo[1:5]), int(ultimo[5:7]), 1)
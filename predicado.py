@@ -0,0 +1,133 @@
+import json
+import operator
+from datetime import datetime, timezone
+
+# ********************* PREDICADO DE EXPORTAÇÃO *********************************
+#
+# Seleção declarativa dos registros exportados, compilada para um WHERE do
+# SQLAlchemy para que só as linhas que passam no filtro saiam do banco.
+#
+#   {
+#       "co2": {">": 20},                       limites em qualquer medida
+#       "temperatura": {">=": -10, "<=": 60},
+#       "de": "2024-01-01", "ate": "2024-07-01", intervalo de tempo_registro (de <= t < ate)
+#       "dispositivo": "GrupoX"                 um dispositivo ou lista deles
+#   }
+
+MEDIDAS_FILTRAVEIS = ("temperatura", "pressao", "altitude", "umidade", "co2")
+
+OPERADORES = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "=": operator.eq,
+    "!=": operator.ne
+}
+
+# Filtro usado antes desta configuração existir
+PREDICADO_PADRAO = {"co2": {">": 20}}
+
+
+def _tempo(valor):
+    """Data ISO ou timestamp unix -> datetime UTC sem tz (como em tempo_registro)."""
+    if isinstance(valor, (int, float)):
+        return datetime.fromtimestamp(valor, tz=timezone.utc).replace(tzinfo=None)
+    data = datetime.fromisoformat(valor)
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+
+def valida_predicado(spec):
+    """Confere a especificação e devolve uma cópia normalizada. ValueError se inválida."""
+    if not isinstance(spec, dict):
+        raise ValueError("o predicado deve ser um objeto JSON")
+    normalizado = {}
+    for chave, valor in spec.items():
+        if chave in MEDIDAS_FILTRAVEIS:
+            if not isinstance(valor, dict) or not valor:
+                raise ValueError(f"{chave}: use um objeto como {{\">\": 20}}")
+            limites = {}
+            for op, limite in valor.items():
+                if op not in OPERADORES:
+                    raise ValueError(f"{chave}: operador '{op}' inválido (use {', '.join(OPERADORES)})")
+                if isinstance(limite, bool) or not isinstance(limite, (int, float)):
+                    raise ValueError(f"{chave} {op}: o limite deve ser um número")
+                limites[op] = limite
+            normalizado[chave] = limites
+        elif chave in ("de", "ate"):
+            try:
+                normalizado[chave] = _tempo(valor)
+            except (TypeError, ValueError, OverflowError, OSError):
+                raise ValueError(f"{chave}: data inválida '{valor}'")
+        elif chave == "dispositivo":
+            dispositivos = [valor] if isinstance(valor, str) else valor
+            if not isinstance(dispositivos, list) or not all(isinstance(d, str) for d in dispositivos):
+                raise ValueError("dispositivo: use um nome ou uma lista de nomes")
+            normalizado[chave] = dispositivos
+        else:
+            raise ValueError(f"campo desconhecido no predicado: '{chave}'")
+    return normalizado
+
+
+def compila_predicado(spec, modelo):
+    """Lista de condições SQLAlchemy (para `.filter(*condicoes)`) sobre as colunas de `modelo`."""
+    spec = valida_predicado(spec)
+    condicoes = []
+    for medida in MEDIDAS_FILTRAVEIS:
+        for op, limite in spec.get(medida, {}).items():
+            condicoes.append(OPERADORES[op](getattr(modelo, medida), limite))
+    if "de" in spec:
+        condicoes.append(modelo.tempo_registro >= spec["de"])
+    if "ate" in spec:
+        condicoes.append(modelo.tempo_registro < spec["ate"])
+    if "dispositivo" in spec:
+        dispositivos = spec["dispositivo"]
+        if len(dispositivos) == 1:
+            condicoes.append(modelo.dispositivo == dispositivos[0])
+        else:
+            condicoes.append(modelo.dispositivo.in_(dispositivos))
+    return condicoes
+
+
+def funcao_predicado(spec):
+    """Mesma seleção de compila_predicado para um registro já lido (dict com as colunas).
+
+    Usada nas linhas que não passam pelo WHERE (arquivo Parquet, registro
+    apagado). Medida nula não passa em nenhum limite, como no SQL.
+    """
+    spec = valida_predicado(spec)
+    limites = [(medida, OPERADORES[op], limite)
+               for medida in MEDIDAS_FILTRAVEIS for op, limite in spec.get(medida, {}).items()]
+    de, ate = spec.get("de"), spec.get("ate")
+    dispositivos = set(spec.get("dispositivo", ()))
+
+    def passa(registro):
+        for medida, operador, limite in limites:
+            valor = registro.get(medida)
+            if valor is None or not operador(valor, limite):
+                return False
+        tempo = registro.get("tempo_registro")
+        if (de is not None or ate is not None) and tempo is None:
+            return False
+        if de is not None and tempo < de:
+            return False
+        if ate is not None and tempo >= ate:
+            return False
+        return not dispositivos or registro.get("dispositivo") in dispositivos
+    return passa
+
+
+def assinatura_predicado(spec):
+    """Texto estável do predicado; muda sempre que a seleção muda."""
+    return json.dumps(spec, sort_keys=True, default=str)
+
+
+def le_predicado(texto, dispositivo=None):
+    """Predicado a partir do JSON da configuração (vazio = padrão), com o dispositivo opcional."""
+    spec = json.loads(texto) if texto else dict(PREDICADO_PADRAO)
+    if dispositivo:
+        spec["dispositivo"] = dispositivo
+    valida_predicado(spec)
+    return spec
@@ -1,28 +1,312 @@
 # pip install mysql-connector-python
 # pip install streamlit
-import mysql.connector 
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+
+from mysql.connector import pooling
 import streamlit as st
 
+from arquivo import ArquivoRegistros
+from rollup import resumo_medidas
+
+
+# Configuração
+#
+# As credenciais vêm de .streamlit/secrets.toml (seção [mysql]) ou das
+# variáveis de ambiente MYSQL_*:
+#
+#   [mysql]
+#   host = "127.0.0.1"
+#   port = 3306
+#   user = "root"
+#   password = "..."
+#   database = "medidor"
+#   pool_size = 5
+#   pool_timeout = 10
+
+def _config_banco():
+    try:
+        secrets = dict(st.secrets["mysql"])
+    except Exception:
+        secrets = {}
+
+    def valor(chave, padrao=None):
+        return secrets.get(chave, os.environ.get(f"MYSQL_{chave.upper()}", padrao))
+
+    return {
+        "host": valor("host", "127.0.0.1"),
+        "port": int(valor("port", 3306)),
+        "user": valor("user", "root"),
+        "password": valor("password", ""),
+        "database": valor("database", "medidor"),
+        "pool_size": int(valor("pool_size", 5)),
+        "pool_timeout": float(valor("pool_timeout", 10))
+    }
+
+
+# Pool de conexões
+
+class PoolConexoes:
+    """Pool de conexões MySQL seguro para várias sessões do Streamlit.
+
+    Cada chamada pega uma conexão do pool (esperando até `timeout` segundos
+    se todas estiverem em uso), testa se ela ainda está viva e reconecta se
+    o servidor tiver derrubado a conexão.
+    """
+
+    def __init__(self, host, port, user, password, database, pool_size=5, pool_timeout=10):
+        self.timeout = pool_timeout
+        self.tamanho = pool_size
+        self._pool = pooling.MySQLConnectionPool(
+            pool_name="dashboard",
+            pool_size=pool_size,
+            pool_reset_session=True,
+            host=host,
+            port=port,
+            user=user,
+            password=password,
+            database=database
+        )
+        self._vagas = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+
+        self.em_uso = 0
+        self.retiradas = 0
+        self.esperas = 0
+        self.tempo_espera_total = 0.0
+        self.maior_espera = 0.0
+        self.timeouts = 0
+        self.reconexoes = 0
+
+    @contextmanager
+    def conexao(self):
+        inicio = time.perf_counter()
+        if not self._vagas.acquire(blocking=False):
+            with self._lock:
+                self.esperas += 1
+            if not self._vagas.acquire(timeout=self.timeout):
+                with self._lock:
+                    self.timeouts += 1
+                raise pooling.PoolError(f"Nenhuma conexão livre no pool após {self.timeout}s")
+        espera = time.perf_counter() - inicio
+
+        try:
+            conn = self._pool.get_connection()
+        except Exception:
+            self._vagas.release()
+            raise
 
-# Conexão
+        with self._lock:
+            self.em_uso += 1
+            self.retiradas += 1
+            self.tempo_espera_total += espera
+            self.maior_espera = max(self.maior_espera, espera)
 
-conn = mysql.connector.connect(
-    host="127.0.0.1",
-    port="3306",
-    user="root",
-    password="senai@134",
-    db="medidor"
-    )
+        try:
+            if not conn.is_connected():
+                conn.reconnect(attempts=3, delay=1)
+                with self._lock:
+                    self.reconexoes += 1
+            yield conn
+        finally:
+            conn.close()  # devolve a conexão ao pool
+            with self._lock:
+                self.em_uso -= 1
+            self._vagas.release()
 
-if conn.is_connected():
-    print("Conexão bem-sucedida ao banco de dados!")
-else:
-    print("Falha na conexão ao banco de dados.")
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "tamanho": self.tamanho,
+                "em_uso": self.em_uso,
+                "retiradas": self.retiradas,
+                "esperas": self.esperas,
+                "tempo_espera_total_s": self.tempo_espera_total,
+                "maior_espera_s": self.maior_espera,
+                "timeouts": self.timeouts,
+                "reconexoes": self.reconexoes
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Cria o pool na primeira utilização (a importação não abre conexão)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexoes(**_config_banco())
+                print("Pool de conexões com o banco de dados criado!")
+    return _pool
+
+
+@contextmanager
+def cursor(buffered=True):
+    """Cursor próprio da chamada; `buffered=False` lê do servidor sob demanda."""
+    with get_pool().conexao() as conn:
+        c = conn.cursor(buffered=buffered)
+        try:
+            yield c
+        finally:
+            if not buffered:
+                # Descarta o que sobrou para a conexão voltar limpa ao pool.
+                try:
+                    c.fetchall()
+                except Exception:
+                    pass
+            c.close()
+
+
+def pool_stats():
+    return get_pool().estatisticas()
 
-c=conn.cursor()
 
 # fetch
+
+# Colunas na ordem usada pelo dashboard
+SELECT_REGISTRO = 'select id, temperatura, pressao, altitude, umidade, co2, tempo_registro, dispositivo from registro'
+CAMPOS_DASHBOARD = ("temperatura", "pressao", "altitude", "umidade", "co2", "tempo_registro", "dispositivo")
+
+# Registros antigos movidos da tabela para Parquet (flask registro-arquivar no backend)
+arquivo_registros = ArquivoRegistros(os.environ.get("ARQUIVO_DIR", "arquivo_registro"))
+
 def view_all_data():
-    c.execute('select * from registro order by id asc')
-    data=c.fetchall()
-    return data
\ No newline at end of file
+    with cursor() as c:
+        c.execute(SELECT_REGISTRO + ' order by id asc')
+        data = c.fetchall()
+    return data
+
+
+def iter_data_since(ultimo_id, tamanho_bloco=5000):
+    """Registros com id maior que `ultimo_id` em blocos, com cursor não bufferizado.
+
+    O driver não guarda o resultado inteiro antes da primeira linha: só o
+    bloco atual fica em memória.
+    """
+    with cursor(buffered=False) as c:
+        c.execute(SELECT_REGISTRO + ' where id > %s order by id asc', (int(ultimo_id),))
+        while True:
+            bloco = c.fetchmany(tamanho_bloco)
+            if not bloco:
+                break
+            yield bloco
+
+
+def _iter_arquivadas(ultimo_id, tamanho_bloco):
+    """Registros arquivados com id maior que `ultimo_id`, lidos do Parquet de `tamanho_bloco` em `tamanho_bloco`."""
+    while True:
+        bloco = arquivo_registros.ler(CAMPOS_DASHBOARD, after_id=ultimo_id, limite=tamanho_bloco)
+        yield from bloco
+        if len(bloco) < tamanho_bloco:
+            return
+        ultimo_id = bloco[-1][0]
+
+
+def view_data_since(ultimo_id, tamanho_bloco=5000):
+    """Somente os registros com id maior que `ultimo_id` (carga incremental), incluindo os arquivados.
+
+    Gera blocos de até `tamanho_bloco` linhas em ordem de id, intercalando a
+    tabela e o arquivo: o chamador acrescenta cada bloco assim que chega, sem
+    juntar o resultado inteiro numa lista.
+    """
+    quentes = itertools.chain.from_iterable(iter_data_since(ultimo_id, tamanho_bloco))
+    linhas = heapq.merge(_iter_arquivadas(int(ultimo_id), tamanho_bloco), quentes, key=lambda linha: linha[0])
+    bloco = []
+    anterior = None
+    for linha in linhas:
+        # Linha copiada para o arquivo e ainda não apagada da tabela aparece nas duas fontes
+        if linha[0] == anterior:
+            continue
+        anterior = linha[0]
+        bloco.append(linha)
+        if len(bloco) >= tamanho_bloco:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def count_until(ultimo_id):
+    with cursor() as c:
+        c.execute('select count(*) from registro where id <= %s', (int(ultimo_id),))
+        quentes = c.fetchone()[0]
+    return quentes + arquivo_registros.contagem(int(ultimo_id))
+
+
+def view_ids_until(ultimo_id):
+    with cursor() as c:
+        c.execute('select id from registro where id <= %s order by id asc', (int(ultimo_id),))
+        ids = [linha[0] for linha in c.fetchall()]
+    arquivados = arquivo_registros.ids_ate(int(ultimo_id))
+    return sorted(set(ids).union(arquivados)) if arquivados else ids
+
+
+# Resumo (registro_resumo e registro_histograma, mantidos pelo backend a cada
+# insert): poucas linhas por medida, qualquer que seja o tamanho da tabela
+
+def view_resumo(dispositivo=None):
+    """{"resumo": {medida: estatísticas e histograma}, "dispositivos": [...]}, como GET /registro/resumo."""
+    with cursor() as c:
+        if dispositivo is None:
+            c.execute('select medida, sum(contagem), sum(soma), min(minimo), max(maximo), sum(soma_quadrados) '
+                      'from registro_resumo group by medida')
+            acumuladores = c.fetchall()
+            c.execute('select medida, faixa, sum(contagem) from registro_histograma group by medida, faixa')
+        else:
+            c.execute('select medida, contagem, soma, minimo, maximo, soma_quadrados '
+                      'from registro_resumo where dispositivo = %s', (dispositivo,))
+            acumuladores = c.fetchall()
+            c.execute('select medida, faixa, contagem from registro_histograma where dispositivo = %s', (dispositivo,))
+        faixas = c.fetchall()
+        c.execute('select distinct dispositivo from registro_resumo order by dispositivo')
+        dispositivos = [linha[0] for linha in c.fetchall() if linha[0]]
+    return {"resumo": resumo_medidas(acumuladores, faixas), "dispositivos": dispositivos}
+
+
+def view_resumo_api(api_url, dispositivo=None):
+    consulta = "" if dispositivo is None else "?" + urllib.parse.urlencode({"dispositivo": dispositivo})
+    with urllib.request.urlopen(f"{api_url}/registro/resumo{consulta}", timeout=10) as resposta:
+        dados = json.load(resposta)
+    return {"resumo": dados["resumo"], "dispositivos": dados["dispositivos"]}
+
+
+def view_serie_api(api_url, pontos, dispositivo=None, metodo="lttb"):
+    """Séries de todas as medidas já reduzidas pela API (/registro/serie), sem trazer as linhas."""
+    parametros = {"pontos": int(pontos), "metodo": metodo}
+    if dispositivo is not None:
+        parametros["dispositivo"] = dispositivo
+    with urllib.request.urlopen(f"{api_url}/registro/serie?{urllib.parse.urlencode(parametros)}", timeout=60) as resposta:
+        return json.load(resposta)["serie"]
+
+
+# fetch pela API em Arrow (DASH_FONTE=api): o dashboard não precisa de acesso ao MySQL
+
+def _arrow_api(api_url, consulta):
+    import pyarrow as pa
+    with urllib.request.urlopen(f"{api_url}/registro/exportar/arrow?{consulta}", timeout=60) as resposta:
+        return pa.ipc.open_stream(resposta).read_all()
+
+
+def view_data_since_arrow(api_url, ultimo_id):
+    """Registros com id maior que `ultimo_id` como pyarrow.Table (colunas na ordem do dashboard)."""
+    campos = "id,temperatura,pressao,altitude,umidade,co2,tempo_registro,dispositivo"
+    return _arrow_api(api_url, f"after_id={int(ultimo_id)}&campos={campos}")
+
+
+def view_ids_until_arrow(api_url, ultimo_id):
+    return _arrow_api(api_url, f"campos=id&until_id={int(ultimo_id)}").column("id").to_numpy()
+
+
+def count_until_arrow(api_url, ultimo_id):
+    with urllib.request.urlopen(f"{api_url}/registro/contagem?until_id={int(ultimo_id)}", timeout=60) as resposta:
+        return json.load(resposta)["contagem"]
@@ -0,0 +1,53 @@
+import numpy as np
+
+# ********************* REDUÇÃO DE PONTOS (LTTB / MIN-MAX) *********************************
+#
+# Só numpy: usada pelo dashboard (amostragem.py) e pela API (/registro/serie),
+# que não depende do pandas.
+
+
+def lttb(x, y, pontos):
+    """Índices escolhidos pelo Largest-Triangle-Three-Buckets (x crescente)."""
+    n = len(x)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+
+    indices = np.empty(pontos, dtype="int64")
+    indices[0] = 0
+    indices[-1] = n - 1
+    # Limites dos buckets (o primeiro e o último ponto ficam sozinhos)
+    limites = np.linspace(1, n - 1, pontos - 1).astype("int64")
+    a = 0
+    for i in range(pontos - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        prox_inicio, prox_fim = limites[i + 1], (limites[i + 2] if i + 2 < len(limites) else n)
+        media_x = x[prox_inicio:prox_fim].mean()
+        media_y = y[prox_inicio:prox_fim].mean()
+        # Área do triângulo (ponto escolhido anterior, candidato, média do próximo bucket)
+        areas = np.abs(
+            (x[a] - media_x) * (y[inicio:fim] - y[a])
+            - (x[a] - x[inicio:fim]) * (media_y - y[a])
+        )
+        a = inicio + int(np.nanargmax(areas)) if not np.all(np.isnan(areas)) else inicio
+        indices[i + 1] = a
+    return indices
+
+
+def minmax_por_bucket(x, y, pontos):
+    """Índices do mínimo e do máximo de y em cada um de `pontos // 2` buckets de x."""
+    n = len(x)
+    if pontos >= n:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    buckets = max(pontos // 2, 1)
+    largura = (x[-1] - x[0]) / buckets or 1.0
+    bucket = np.minimum(((x - x[0]) / largura).astype("int64"), buckets - 1)
+
+    ordem = np.lexsort((y, bucket))
+    bucket_ordenado = bucket[ordem]
+    inicio = np.flatnonzero(np.r_[True, bucket_ordenado[1:] != bucket_ordenado[:-1]])
+    fim = np.r_[inicio[1:], n] - 1
+    return np.unique(np.concatenate([ordem[inicio], ordem[fim]]))
@@ -0,0 +1,162 @@
+import math
+from datetime import timedelta
+
+# ********************* AGREGADOS (ROLLUPS) *********************************
+
+MEDIDAS = ("temperatura", "pressao", "altitude", "umidade", "co2")
+
+# Duração de cada granularidade, em segundos
+GRANULARIDADES = {
+    "minuto": 60,
+    "hora": 3600,
+    "dia": 86400
+}
+
+# Largura das faixas do histograma de cada medida (registro_histograma). As
+# faixas do dashboard (inteiros, ou de 1000 em 1000 para co2 e pressão) são
+# somas destas.
+LARGURAS_HISTOGRAMA = {
+    "temperatura": 1.0,
+    "pressao": 10.0,
+    "altitude": 1.0,
+    "umidade": 1.0,
+    "co2": 10.0
+}
+
+# Nomes aceitos na query string
+ALIASES_GRANULARIDADE = {
+    "minute": "minuto",
+    "hour": "hora",
+    "day": "dia"
+}
+
+
+def normaliza_granularidade(nome):
+    nome = ALIASES_GRANULARIDADE.get(nome, nome)
+    if nome not in GRANULARIDADES:
+        raise ValueError(f"granularidade deve ser uma de: {', '.join(GRANULARIDADES)}")
+    return nome
+
+
+def inicio_bucket(tempo, granularidade):
+    """Início do intervalo (minuto, hora ou dia) que contém `tempo`."""
+    if granularidade == "minuto":
+        return tempo.replace(second=0, microsecond=0)
+    if granularidade == "hora":
+        return tempo.replace(minute=0, second=0, microsecond=0)
+    return tempo.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def fim_bucket(inicio, granularidade):
+    return inicio + timedelta(seconds=GRANULARIDADES[granularidade])
+
+
+def agrega_linhas(linhas):
+    """Agrega linhas (dicts com as medidas, tempo_registro e dispositivo) por bucket.
+
+    Devolve {(granularidade, bucket, medida, dispositivo): [contagem, soma, minimo, maximo, soma_quadrados]}.
+    Valores nulos são ignorados, então cada medida tem a sua própria contagem;
+    linhas sem dispositivo ficam com dispositivo ''.
+    """
+    agregados = {}
+    for linha in linhas:
+        tempo = linha.get("tempo_registro")
+        if tempo is None:
+            continue
+        if tempo.tzinfo is not None:
+            tempo = tempo.replace(tzinfo=None)
+        dispositivo = linha.get("dispositivo") or ""
+        buckets = [(g, inicio_bucket(tempo, g)) for g in GRANULARIDADES]
+        for medida in MEDIDAS:
+            valor = linha.get(medida)
+            if valor is None:
+                continue
+            valor = float(valor)
+            for granularidade, bucket in buckets:
+                chave = (granularidade, bucket, medida, dispositivo)
+                atual = agregados.get(chave)
+                if atual is None:
+                    agregados[chave] = [1, valor, valor, valor, valor * valor]
+                else:
+                    atual[0] += 1
+                    atual[1] += valor
+                    if valor < atual[2]:
+                        atual[2] = valor
+                    if valor > atual[3]:
+                        atual[3] = valor
+                    atual[4] += valor * valor
+    return agregados
+
+
+def estatisticas(contagem, soma, minimo, maximo, soma_quadrados):
+    """Média e desvio padrão (populacional) a partir dos acumuladores do bucket."""
+    if not contagem:
+        return {"contagem": 0, "media": None, "minimo": None, "maximo": None, "desvio_padrao": None}
+    media = soma / contagem
+    variancia = max(soma_quadrados / contagem - media * media, 0.0)
+    return {
+        "contagem": contagem,
+        "media": media,
+        "minimo": minimo,
+        "maximo": maximo,
+        "desvio_padrao": math.sqrt(variancia)
+    }
+
+
+# ********************* RESUMO E HISTOGRAMAS (DASHBOARD) *********************************
+
+
+def agrega_resumo(agregados):
+    """Junta os buckets diários de agrega_linhas em {(medida, dispositivo): acumuladores}."""
+    resumo = {}
+    for (granularidade, _, medida, dispositivo), a in agregados.items():
+        if granularidade != "dia":
+            continue
+        atual = resumo.get((medida, dispositivo))
+        if atual is None:
+            resumo[(medida, dispositivo)] = list(a)
+        else:
+            atual[0] += a[0]
+            atual[1] += a[1]
+            atual[2] = min(atual[2], a[2])
+            atual[3] = max(atual[3], a[3])
+            atual[4] += a[4]
+    return resumo
+
+
+def agrega_histograma(linhas, sinal=1):
+    """Contagens {(medida, dispositivo, faixa): n} das linhas; `sinal=-1` para linhas removidas.
+
+    Como em agrega_linhas, linhas sem tempo_registro e valores nulos ficam de fora.
+    """
+    contagens = {}
+    for linha in linhas:
+        if linha.get("tempo_registro") is None:
+            continue
+        dispositivo = linha.get("dispositivo") or ""
+        for medida, largura in LARGURAS_HISTOGRAMA.items():
+            valor = linha.get(medida)
+            if valor is None:
+                continue
+            chave = (medida, dispositivo, math.floor(float(valor) / largura))
+            contagens[chave] = contagens.get(chave, 0) + sinal
+    return contagens
+
+
+def resumo_medidas(acumuladores, faixas):
+    """Estatísticas e histograma de cada medida.
+
+    `acumuladores` são linhas (medida, contagem, soma, minimo, maximo,
+    soma_quadrados) e `faixas` linhas (medida, faixa, contagem). Cada
+    histograma vem como {"largura": l, "faixas": [[inicio, contagem], ...]},
+    só com as faixas não vazias.
+    """
+    resumo = {}
+    for medida, contagem, soma, minimo, maximo, soma_quadrados in acumuladores:
+        # SUM() no MySQL devolve Decimal
+        resumo[medida] = estatisticas(int(contagem), float(soma), float(minimo), float(maximo), float(soma_quadrados))
+        resumo[medida]["histograma"] = {"largura": LARGURAS_HISTOGRAMA[medida], "faixas": []}
+    for medida, faixa, contagem in sorted(faixas):
+        if medida in resumo and contagem:
+            resumo[medida]["histograma"]["faixas"].append([faixa * LARGURAS_HISTOGRAMA[medida], int(contagem)])
+    return {medida: resumo[medida] for medida in MEDIDAS if medida in resumo}
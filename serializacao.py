@@ -0,0 +1,70 @@
+import json
+from json.encoder import encode_basestring_ascii
+
+# ********************* SERIALIZAÇÃO DE REGISTROS *********************************
+#
+# Caminho rápido para devolver muitas linhas de `registro` em JSON: recebe as
+# tuplas de colunas da consulta (sem objetos do ORM) e monta o texto de cada
+# linha com um modelo '%s' pronto, sem criar dicts nem passar pelo
+# json.dumps. A saída equivale à de json.dumps(Registro.to_json()): mesmos
+# nomes, mesma ordem de campos, números como números e datas
+# 'AAAA-MM-DD HH:MM:SS'.
+
+# Conversão de cada tipo de campo em texto JSON para o '%s' do modelo.
+# Numeric chega como Decimal e str(Decimal) já é um número JSON válido
+# ('23.40' == 23.4), então as medidas entram direto.
+
+
+def _numero(valor):
+    return "null" if valor is None else valor
+
+
+def _texto(valor):
+    return "null" if valor is None else encode_basestring_ascii(valor)
+
+
+def _tempo(valor):
+    return "null" if valor is None else '"' + valor.isoformat(" ", "seconds") + '"'
+
+
+CONVERSORES = {
+    "dispositivo": _texto,
+    "tempo_registro": _tempo
+}
+
+
+class CodificadorRegistros:
+    """Codifica listas de tuplas (na ordem de `campos`) em texto JSON.
+
+    O modelo de texto de um objeto ('{"id": %s, ...}', com os nomes já
+    escapados) é montado uma vez; cada linha só passa pelos conversores dos
+    seus valores e por uma formatação com %.
+    """
+
+    def __init__(self, campos):
+        self.campos = tuple(campos)
+        self.modelo = "{" + ", ".join(
+            encode_basestring_ascii(campo).replace("%", "%%") + ": %s" for campo in self.campos
+        ) + "}"
+        self.conversores = tuple(CONVERSORES.get(campo, _numero) for campo in self.campos)
+
+    def objetos(self, linhas, inicio=0):
+        """Um texto JSON por linha; `inicio` pula colunas extras no começo da tupla (ex.: o cursor)."""
+        modelo = self.modelo
+        conversores = self.conversores
+        return [modelo % tuple([converte(valor) for converte, valor in zip(conversores, linha[inicio:])])
+                for linha in linhas]
+
+    def lista(self, linhas, inicio=0):
+        """As linhas como um array JSON."""
+        return "[" + ", ".join(self.objetos(linhas, inicio)) + "]"
+
+
+def corpo_json(nome_do_conteudo, conteudo_json, mensagem=False, **extras):
+    """Mesmo envelope do gera_response, com o conteúdo já serializado."""
+    partes = [encode_basestring_ascii(nome_do_conteudo) + ": " + conteudo_json]
+    if mensagem:
+        partes.append('"mensagem": ' + encode_basestring_ascii(mensagem))
+    for chave, valor in extras.items():
+        partes.append(encode_basestring_ascii(chave) + ": " + json.dumps(valor))
+    return "{" + ", ".join(partes) + "}"
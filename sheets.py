@@ -0,0 +1,618 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+# ********************* SERVIÇO GOOGLE SHEETS *********************************
+
+
+class SheetsService:
+    """Mantém as credenciais e o cliente `sheets v4` vivos entre as chamadas.
+
+    As credenciais são lidas do disco uma única vez, o token é reaproveitado
+    até expirar e o cliente (documento de discovery e conexão HTTP) é
+    construído só na primeira chamada ou depois de `invalidar()`. O acesso
+    é protegido por lock; o cliente em si (httplib2) não é thread-safe, então
+    deve ser usado por uma thread de cada vez — no backend só a thread do
+    pipeline de ingestão fala com a API.
+    """
+
+    def __init__(self, credentials_path, scopes, carregar_credenciais=None, construir=None):
+        self.credentials_path = credentials_path
+        self.scopes = scopes
+        self._carregar_credenciais = carregar_credenciais or self._credenciais_service_account
+        self._construir = construir or self._construir_cliente
+        self._lock = threading.Lock()
+        self._creds = None
+        self._service = None
+
+        self.carregamentos = 0
+        self.builds = 0
+        self.refreshes = 0
+        self.reusos = 0
+
+    @staticmethod
+    def _credenciais_service_account(path, scopes):
+        from google.oauth2 import service_account
+        return service_account.Credentials.from_service_account_file(path, scopes=scopes)
+
+    @staticmethod
+    def _construir_cliente(creds):
+        from googleapiclient.discovery import build
+        return build('sheets', 'v4', credentials=creds, cache_discovery=False)
+
+    @staticmethod
+    def _renovar_token(creds):
+        from google.auth.transport.requests import Request
+        creds.refresh(Request())
+
+    def get(self):
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._carregar_credenciais(self.credentials_path, self.scopes)
+                self.carregamentos += 1
+
+            if self._service is None:
+                self._service = self._construir(self._creds)
+                self.builds += 1
+            elif not getattr(self._creds, 'valid', True):
+                # Token ausente ou expirado: renova antes de devolver o cliente.
+                self._renovar_token(self._creds)
+                self.refreshes += 1
+            else:
+                self.reusos += 1
+            return self._service
+
+    def renovar(self):
+        """Força a renovação do token mantendo o cliente construído."""
+        with self._lock:
+            if self._creds is not None:
+                self._renovar_token(self._creds)
+                self.refreshes += 1
+
+    def invalidar(self, credenciais=False):
+        """Descarta o cliente (e, se pedido, as credenciais) para reconstruir na próxima chamada."""
+        with self._lock:
+            self._service = None
+            if credenciais:
+                self._creds = None
+
+    def metricas(self):
+        with self._lock:
+            return {
+                "carregamentos_credenciais": self.carregamentos,
+                "builds": self.builds,
+                "refreshes": self.refreshes,
+                "reusos": self.reusos
+            }
+
+
+# ********************* COTA E RETENTATIVAS *********************************
+
+# Erros que valem nova tentativa: cota estourada e falhas do lado do Google
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+
+class BaldeTokens:
+    """Token bucket: rajadas de até `capacidade` chamadas, repostas a `taxa` por segundo.
+
+    A cota de escrita do Sheets é por minuto (60 requisições por usuário no
+    padrão), então `taxa=1.0` com uma rajada pequena nunca a ultrapassa.
+    """
+
+    def __init__(self, taxa, capacidade, relogio=time.monotonic):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.relogio = relogio
+        self._tokens = float(capacidade)
+        self._ultimo = relogio()
+        self._lock = threading.Lock()
+
+    def reservar(self):
+        """Consome um token e devolve quantos segundos esperar até ele estar disponível."""
+        with self._lock:
+            agora = self.relogio()
+            self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+            self._ultimo = agora
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.taxa
+
+
+def status_erro(erro):
+    """Código HTTP de um HttpError (googleapiclient) ou ErroSheets; None se não houver."""
+    status = getattr(erro, 'status', None)
+    if status is None:
+        status = getattr(getattr(erro, 'resp', None), 'status', None)
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return None
+
+
+def atraso_backoff(tentativa, base, maximo):
+    """Backoff exponencial com jitter completo: uniforme em [0, min(maximo, base * 2^tentativa)]."""
+    return random.uniform(0, min(maximo, base * 2 ** tentativa))
+
+
+# ********************* SINCRONIZAÇÃO GOOGLE SHEETS *********************************
+
+CABECALHO = ["CO2", "Temperatura", "Pressão", "Altitude", "Umidade", "Tempo Registro"]
+
+
+def registro_para_linha(registro):
+    """Converte um registro (dict de to_json) em uma linha da planilha."""
+    return [
+        registro['co2'],
+        registro['temperatura'],
+        registro['pressao'],
+        registro['altitude'],
+        registro['umidade'],
+        registro['tempo_registro']
+    ]
+
+
+class SheetsSync:
+    """Envia para a planilha apenas os registros novos (append-only).
+
+    Guarda em disco o maior id já sincronizado (marca d'água), então cada
+    sincronização lê do banco e envia para a API só as linhas com id maior.
+    A marca só avança depois que a escrita foi aceita: o que não foi enviado
+    continua no banco e sai na próxima sincronização, mesmo depois de um
+    reinício. Quando um registro já exportado é apagado a planilha é
+    reescrita por completo na próxima sincronização (resync).
+
+    O id é do autoincremento, mas os inserts não são confirmados em ordem de
+    id (/data/batch e vários consumidores gravam ao mesmo tempo): uma linha
+    de id menor pode aparecer depois que a marca já passou dela. Por isso
+    cada sincronização relê os `janela` ids abaixo da marca, e os ids já
+    enviados nessa faixa ficam no estado para não sair duas vezes. Uma
+    transação que demore mais do que `janela` novos ids ainda perde linhas.
+
+    Cada sincronização junta todas as linhas pendentes em escritas de até
+    `lote` registros. Toda chamada à API passa pelo `balde` (BaldeTokens) e
+    erros 429/5xx são repetidos até `tentativas` vezes com backoff
+    exponencial. Se `observar` for dado, recebe a duração em segundos de
+    cada chamada à API (inclusive as que falharam).
+
+    `get_service` deve devolver um objeto com a mesma interface do serviço
+    `sheets v4` e `buscar_registros(ultimo_id, limite)` deve devolver os
+    registros a exportar (dicts de `Registro.to_json`, já filtrados) com id
+    maior que `ultimo_id`, em ordem crescente de id. `filtro` identifica a
+    seleção usada; se for diferente da salva no estado a planilha é
+    reescrita.
+    """
+
+    def __init__(self, get_service, buscar_registros, spreadsheet_id, aba='Registro',
+                 estado_path='sheets_sync_state.json', lote=5000, balde=None, tentativas=5,
+                 backoff_base=1.0, backoff_max=60.0, dormir=time.sleep, filtro=None, observar=None,
+                 janela=0):
+        self.get_service = get_service
+        self.buscar_registros = buscar_registros
+        self.spreadsheet_id = spreadsheet_id
+        self.aba = aba
+        self.estado_path = estado_path
+        self.lote = lote
+        self.balde = balde
+        self.tentativas = tentativas
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dormir = dormir
+        self.observar = observar
+        self.janela = janela
+        self._lock = threading.Lock()
+        self.filtro = filtro
+        self.estado = self._carregar_estado()
+        if self.estado["filtro"] != filtro:
+            # A planilha foi montada com outra seleção de registros
+            self.estado["filtro"] = filtro
+            self.estado["resync_pendente"] = True
+
+        # Métricas
+        self.escritas = 0
+        self.linhas_enviadas = 0
+        self.celulas = 0
+        self.maior_escrita_celulas = 0
+        self.retentativas = 0
+        self.falhas = 0
+        self.espera_cota = 0.0
+        self.ultimo_atraso = 0.0
+        self.maior_atraso = 0.0
+        self.ultima_sincronizacao = None
+
+    # ---------------- estado persistido ----------------
+
+    def _carregar_estado(self):
+        try:
+            with open(self.estado_path, encoding='utf-8') as f:
+                estado = json.load(f)
+            ultimo_id = int(estado.get("ultimo_id", 0))
+            return {
+                "ultimo_id": ultimo_id,
+                "resync_pendente": bool(estado.get("resync_pendente", False)),
+                # Estados antigos não tinham o campo: assume a seleção atual
+                "filtro": estado.get("filtro", self.filtro),
+                # Ids já enviados acima de inicio_janela; estados antigos não
+                # sabem quais são, então a janela começa na marca
+                "recentes": [int(i) for i in estado.get("recentes", [])],
+                "inicio_janela": int(estado.get("inicio_janela", ultimo_id))
+            }
+        except FileNotFoundError:
+            # Sem estado salvo não sabemos o que já está na planilha: reescreve tudo.
+            return self._estado_inicial()
+        except (ValueError, TypeError) as e:
+            print(f"Estado de sincronização inválido ({e}), forçando resync")
+            return self._estado_inicial()
+
+    def _estado_inicial(self):
+        return {"ultimo_id": 0, "resync_pendente": True, "filtro": self.filtro, "recentes": [], "inicio_janela": 0}
+
+    def _salvar_estado(self):
+        tmp = self.estado_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.estado, f)
+        os.replace(tmp, self.estado_path)
+
+    @property
+    def ultimo_id(self):
+        return self.estado["ultimo_id"]
+
+    @property
+    def marca_resync_path(self):
+        return self.estado_path + '.resync'
+
+    def registrar_remocao(self, registro_id, exportavel=True):
+        """Chamado ao deletar um registro; se ele já foi exportado agenda um resync.
+
+        `exportavel` diz se o registro passava no filtro de exportação (se não
+        passava, nunca esteve na planilha). Pode rodar em um processo que não
+        exporta (worker do wsgi.py): a marca d'água é lida do arquivo, não da
+        cópia em memória.
+        """
+        if exportavel and int(registro_id) <= self._carregar_estado()["ultimo_id"]:
+            self.marcar_resync()
+
+    def marcar_resync(self):
+        """Agenda um resync criando o arquivo de marca, que só o exportador apaga.
+
+        O estado em si não é reescrito aqui: em outro processo ele estaria
+        desatualizado e o próximo _salvar_estado do exportador desfaria a marca.
+        """
+        with open(self.marca_resync_path, 'a', encoding='utf-8'):
+            pass
+
+    def _consumir_marca_resync(self):
+        """Passa para o estado um resync agendado por qualquer processo (com self._lock)."""
+        if not os.path.exists(self.marca_resync_path):
+            return
+        self.estado["resync_pendente"] = True
+        self._salvar_estado()
+        # A remoção que criou a marca já está no banco, então o resync a reflete
+        try:
+            os.remove(self.marca_resync_path)
+        except FileNotFoundError:
+            pass
+
+    # ---------------- sincronização ----------------
+
+    def sincronizar(self):
+        """Envia os registros pendentes. Retorna o número de linhas enviadas."""
+        with self._lock:
+            self._consumir_marca_resync()
+            if self.estado["resync_pendente"]:
+                return self._resync()
+            return self._enviar_novos()
+
+    def resync(self):
+        """Reescreve a planilha inteira a partir do banco (backfill)."""
+        with self._lock:
+            self.estado["resync_pendente"] = True
+            self._salvar_estado()
+            return self._resync()
+
+    def _resync(self):
+        values = self.get_service().spreadsheets().values()
+        self._executar(lambda: values.clear(spreadsheetId=self.spreadsheet_id, range=self.aba, body={}).execute())
+        self._executar(lambda: values.update(
+            spreadsheetId=self.spreadsheet_id,
+            range=f"{self.aba}!A1",
+            valueInputOption="USER_ENTERED",
+            body={'values': [CABECALHO]}
+        ).execute())
+        # A marca só é considerada válida quando o resync termina; se o processo
+        # cair no meio o resync é refeito na próxima vez.
+        self._zerar_marca()
+        enviados = self._enviar_novos(salvar=False)
+        self.estado["resync_pendente"] = False
+        self._salvar_estado()
+        return enviados
+
+    def _enviar_novos(self, salvar=True):
+        enviados = 0
+        cursor = self._inicio_leitura()
+        while True:
+            registros = self.buscar_registros(cursor, self.lote)
+            if not registros:
+                break
+
+            linhas = self._linhas(registros)
+            if linhas:
+                self._append(linhas)
+                enviados += len(linhas)
+
+            cursor = registros[-1]['id']
+            if self._avancar(registros, salvar):
+                break
+        return enviados
+
+    def _zerar_marca(self):
+        self.estado.update(ultimo_id=0, recentes=[], inicio_janela=0)
+
+    def _inicio_leitura(self):
+        """Id a partir do qual ler: `janela` ids abaixo da marca (só onde os enviados são conhecidos)."""
+        return max(self.estado["ultimo_id"] - self.janela, self.estado["inicio_janela"], 0)
+
+    def _linhas(self, registros):
+        # A seleção (filtro de exportação) já foi feita no WHERE da consulta;
+        # aqui só saem os da janela que já estão na planilha
+        recentes = set(self.estado["recentes"])
+        return [registro_para_linha(r) for r in registros if r['id'] not in recentes]
+
+    def _avancar(self, registros, salvar):
+        """Move a marca d'água para o último registro enviado; True se não há mais lotes."""
+        marca = max(self.estado["ultimo_id"], registros[-1]['id'])
+        piso = marca - self.janela
+        recentes = set(self.estado["recentes"]).union(r['id'] for r in registros)
+        self.estado["ultimo_id"] = marca
+        self.estado["recentes"] = sorted(i for i in recentes if i > piso)
+        if salvar:
+            self._salvar_estado()
+        return len(registros) < self.lote
+
+    def _append(self, linhas):
+        self._executar(lambda: self.get_service().spreadsheets().values().append(
+            spreadsheetId=self.spreadsheet_id,
+            range=f"{self.aba}!A1",
+            valueInputOption="USER_ENTERED",
+            insertDataOption="INSERT_ROWS",
+            body={'values': linhas}
+        ).execute())
+        self._registrar_escrita(linhas)
+
+    # ---------------- cota, retentativas e métricas ----------------
+
+    def _executar(self, chamada):
+        """Faz a chamada respeitando o balde de tokens e repetindo erros 429/5xx."""
+        tentativa = 0
+        while True:
+            if self.balde is not None:
+                espera = self.balde.reservar()
+                if espera:
+                    self.espera_cota += espera
+                    self.dormir(espera)
+            inicio = time.perf_counter()
+            try:
+                return chamada()
+            except Exception as e:
+                if not self._repetir(e, tentativa):
+                    raise
+            finally:
+                if self.observar is not None:
+                    self.observar(time.perf_counter() - inicio)
+            self.dormir(atraso_backoff(tentativa, self.backoff_base, self.backoff_max))
+            tentativa += 1
+
+    def _repetir(self, erro, tentativa):
+        if status_erro(erro) in STATUS_RETENTAVEIS and tentativa + 1 < self.tentativas:
+            self.retentativas += 1
+            print(f"Sheets respondeu {status_erro(erro)}, nova tentativa ({tentativa + 1}/{self.tentativas - 1})")
+            return True
+        self.falhas += 1
+        return False
+
+    def _registrar_escrita(self, linhas):
+        celulas = len(linhas) * len(CABECALHO)
+        self.escritas += 1
+        self.linhas_enviadas += len(linhas)
+        self.celulas += celulas
+        self.maior_escrita_celulas = max(self.maior_escrita_celulas, celulas)
+        self.ultima_sincronizacao = time.time()
+        # Atraso: idade (pelo horário do registro) da linha mais antiga desta escrita
+        try:
+            mais_antiga = datetime.strptime(linhas[0][-1], '%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError):
+            return
+        agora = datetime.now(timezone.utc).replace(tzinfo=None)
+        self.ultimo_atraso = max(0.0, (agora - mais_antiga).total_seconds())
+        self.maior_atraso = max(self.maior_atraso, self.ultimo_atraso)
+
+    def metricas(self):
+        return {
+            "ultimo_id": self.estado["ultimo_id"],
+            "resync_pendente": self.estado["resync_pendente"],
+            "escritas": self.escritas,
+            "linhas_enviadas": self.linhas_enviadas,
+            "celulas": self.celulas,
+            "media_celulas_por_escrita": self.celulas / self.escritas if self.escritas else 0.0,
+            "maior_escrita_celulas": self.maior_escrita_celulas,
+            "retentativas": self.retentativas,
+            "falhas": self.falhas,
+            "espera_cota_s": self.espera_cota,
+            "ultimo_atraso_s": self.ultimo_atraso,
+            "maior_atraso_s": self.maior_atraso,
+            "segundos_desde_ultima_escrita": (time.time() - self.ultima_sincronizacao
+                                              if self.ultima_sincronizacao else None)
+        }
+
+
+# ********************* GOOGLE SHEETS ASSÍNCRONO (asyncio) *********************************
+
+
+class ErroSheets(Exception):
+    """Resposta de erro da API REST do Sheets (`status` é o código HTTP)."""
+
+    def __init__(self, status, mensagem):
+        super().__init__(f"{status}: {mensagem}")
+        self.status = status
+
+
+class ClienteSheetsAsync:
+    """Chamadas à API REST `sheets v4` com aiohttp, para o modo asyncio.
+
+    Uma única sessão HTTP (com keep-alive) é reaproveitada entre as chamadas.
+    As credenciais são lidas uma vez e o token só é renovado quando expira;
+    a renovação (bloqueante, google-auth) roda em uma thread com
+    `asyncio.to_thread` para não parar o event loop.
+    """
+
+    URL = "https://sheets.googleapis.com/v4/spreadsheets/{id}/values/{intervalo}"
+
+    def __init__(self, credentials_path, scopes, carregar_credenciais=None):
+        self.credentials_path = credentials_path
+        self.scopes = scopes
+        self._carregar_credenciais = carregar_credenciais or SheetsService._credenciais_service_account
+        self._creds = None
+        self._sessao = None
+        self._lock = asyncio.Lock()
+
+        self.refreshes = 0
+        self.chamadas = 0
+        self.erros = 0
+
+    async def _token(self):
+        async with self._lock:
+            if self._creds is None:
+                self._creds = await asyncio.to_thread(
+                    self._carregar_credenciais, self.credentials_path, self.scopes)
+            if not getattr(self._creds, 'valid', True):
+                await asyncio.to_thread(SheetsService._renovar_token, self._creds)
+                self.refreshes += 1
+            return self._creds.token
+
+    async def _chamar(self, metodo, spreadsheet_id, intervalo, sufixo='', params=None, body=None):
+        import aiohttp
+        if self._sessao is None or self._sessao.closed:
+            self._sessao = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+        url = self.URL.format(id=spreadsheet_id, intervalo=quote(intervalo, safe='!:')) + sufixo
+        headers = {'Authorization': f"Bearer {await self._token()}"}
+        self.chamadas += 1
+        async with self._sessao.request(metodo, url, params=params, json=body, headers=headers) as resposta:
+            if resposta.status >= 400:
+                self.erros += 1
+                if resposta.status == 401:
+                    # Token recusado: força nova leitura das credenciais na próxima chamada.
+                    self._creds = None
+                raise ErroSheets(resposta.status, await resposta.text())
+            return await resposta.json()
+
+    async def clear(self, spreadsheet_id, intervalo):
+        return await self._chamar('POST', spreadsheet_id, intervalo, ':clear', body={})
+
+    async def update(self, spreadsheet_id, intervalo, valores):
+        return await self._chamar('PUT', spreadsheet_id, intervalo,
+                                  params={'valueInputOption': 'USER_ENTERED'},
+                                  body={'values': valores})
+
+    async def append(self, spreadsheet_id, intervalo, valores):
+        return await self._chamar('POST', spreadsheet_id, intervalo, ':append',
+                                  params={'valueInputOption': 'USER_ENTERED',
+                                          'insertDataOption': 'INSERT_ROWS'},
+                                  body={'values': valores})
+
+    async def fechar(self):
+        if self._sessao is not None:
+            await self._sessao.close()
+
+    def metricas(self):
+        return {"chamadas": self.chamadas, "erros": self.erros, "refreshes": self.refreshes}
+
+
+class SheetsSyncAsync(SheetsSync):
+    """Mesma sincronização append-only do SheetsSync, com E/S assíncrona.
+
+    `cliente` é um ClienteSheetsAsync e `buscar_registros(ultimo_id, limite)`
+    uma corrotina. O estado em disco (marca d'água e resync pendente) é o
+    mesmo arquivo do modo síncrono.
+    """
+
+    def __init__(self, cliente, buscar_registros, spreadsheet_id, aba='Registro',
+                 estado_path='sheets_sync_state.json', lote=5000, balde=None, tentativas=5,
+                 backoff_base=1.0, backoff_max=60.0, filtro=None, observar=None, janela=0):
+        super().__init__(None, buscar_registros, spreadsheet_id, aba, estado_path, lote,
+                         balde, tentativas, backoff_base, backoff_max, dormir=None, filtro=filtro,
+                         observar=observar, janela=janela)
+        self.cliente = cliente
+        self._lock_async = asyncio.Lock()
+
+    async def sincronizar(self):
+        async with self._lock_async:
+            with self._lock:
+                self._consumir_marca_resync()
+            if self.estado["resync_pendente"]:
+                return await self._resync()
+            return await self._enviar_novos()
+
+    async def resync(self):
+        async with self._lock_async:
+            with self._lock:
+                self.estado["resync_pendente"] = True
+                self._salvar_estado()
+            return await self._resync()
+
+    async def _resync(self):
+        await self._executar_async(lambda: self.cliente.clear(self.spreadsheet_id, self.aba))
+        await self._executar_async(lambda: self.cliente.update(self.spreadsheet_id, f"{self.aba}!A1", [CABECALHO]))
+        self._zerar_marca()
+        enviados = await self._enviar_novos(salvar=False)
+        with self._lock:
+            self.estado["resync_pendente"] = False
+            self._salvar_estado()
+        return enviados
+
+    async def _enviar_novos(self, salvar=True):
+        enviados = 0
+        cursor = self._inicio_leitura()
+        while True:
+            registros = await self.buscar_registros(cursor, self.lote)
+            if not registros:
+                break
+
+            linhas = self._linhas(registros)
+            if linhas:
+                await self._append(linhas)
+                enviados += len(linhas)
+
+            cursor = registros[-1]['id']
+            if self._avancar(registros, salvar):
+                break
+        return enviados
+
+    async def _append(self, linhas):
+        await self._executar_async(lambda: self.cliente.append(self.spreadsheet_id, f"{self.aba}!A1", linhas))
+        self._registrar_escrita(linhas)
+
+    async def _executar_async(self, chamada):
+        """Como SheetsSync._executar, esperando com asyncio.sleep."""
+        tentativa = 0
+        while True:
+            if self.balde is not None:
+                espera = self.balde.reservar()
+                if espera:
+                    self.espera_cota += espera
+                    await asyncio.sleep(espera)
+            inicio = time.perf_counter()
+            try:
+                return await chamada()
+            except Exception as e:
+                if not self._repetir(e, tentativa):
+                    raise
+            finally:
+                if self.observar is not None:
+                    self.observar(time.perf_counter() - inicio)
+            await asyncio.sleep(atraso_backoff(tentativa, self.backoff_base, self.backoff_max))
+            tentativa += 1
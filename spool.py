@@ -0,0 +1,387 @@
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos (um processo por máquina)
+    fcntl = None
+
+# ********************* SPOOL EM DISCO (write-ahead da ingestão) *********************************
+#
+# Toda leitura recebida é primeiro acrescentada a um arquivo local e só
+# depois gravada no banco por uma thread de drenagem, então uma queda ou
+# lentidão do MySQL não perde dados: eles ficam no spool até o banco voltar.
+#
+#   <diretorio>/00/segmento-000000000001.log   registros: [tamanho][crc32][bytes]
+#   <diretorio>/00/segmento-000000000002.log
+#   <diretorio>/00/checkpoint.json             {"segmento": 2, "posicao": 4096}
+#   <diretorio>/00/quarentena.log              registros que o banco recusou sozinhos
+#   <diretorio>/01/...                         spool de outro processo
+#
+# O checkpoint marca até onde os registros já estão no banco; segmentos
+# inteiramente antes dele são apagados. Um registro cortado no fim do
+# último segmento (queda no meio de uma escrita) é descartado na abertura.
+#
+# Cada processo (worker da API, consumidor MQTT) usa o primeiro
+# subdiretório que conseguir travar, então vários processos na mesma
+# máquina não escrevem no mesmo arquivo; ao reiniciar, cada um retoma o
+# que ficou pendente no subdiretório que pegou.
+
+CABECALHO = struct.Struct(">II")
+PREFIXO_SEGMENTO = "segmento-"
+SUFIXO_SEGMENTO = ".log"
+
+
+class SpoolCheio(Exception):
+    pass
+
+
+def _nome_segmento(numero):
+    return f"{PREFIXO_SEGMENTO}{numero:012d}{SUFIXO_SEGMENTO}"
+
+
+def trava_arquivo(caminho):
+    """Trava exclusiva (não bloqueante) em `caminho`: o arquivo aberto, ou None se outro processo a tem.
+
+    A trava dura enquanto o arquivo devolvido estiver aberto.
+    """
+    arquivo = open(caminho, "a+b")
+    if fcntl is None:
+        return arquivo
+    try:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        arquivo.close()
+        return None
+    return arquivo
+
+
+def _fsync_diretorio(diretorio):
+    if not hasattr(os, "O_DIRECTORY"):
+        return  # Windows: renomear já é durável o bastante
+    fd = os.open(diretorio, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _registros(dados, maximo=None):
+    """(conteúdo, posição final) de cada registro completo e íntegro no início de `dados`."""
+    posicao = 0
+    encontrados = []
+    while maximo is None or len(encontrados) < maximo:
+        if posicao + CABECALHO.size > len(dados):
+            break
+        tamanho, crc = CABECALHO.unpack_from(dados, posicao)
+        inicio = posicao + CABECALHO.size
+        fim = inicio + tamanho
+        if fim > len(dados):
+            break
+        conteudo = bytes(dados[inicio:fim])
+        if zlib.crc32(conteudo) != crc:
+            break
+        encontrados.append((conteudo, fim))
+        posicao = fim
+    return encontrados
+
+
+class SpoolIngestao:
+    """Fila persistente de registros (bytes) em segmentos de append, com fsync em grupo.
+
+    `acrescentar(itens)` escreve no segmento atual com uma única chamada
+    `write` e retorna; uma thread faz o fsync a cada `intervalo_fsync`
+    segundos para tudo o que foi escrito nesse meio tempo. Com
+    `duravel=True` a chamada espera o próximo fsync (várias requisições
+    concorrentes compartilham o mesmo). `ler(cursor, maximo)` devolve os
+    próximos registros e o cursor seguinte; `confirmar(cursor, itens)` grava
+    o checkpoint depois que eles chegaram ao banco.
+
+    Nada é aberto na construção: `abrir()` escolhe e trava o subdiretório
+    (importar o main em um comando da CLI não pega um spool).
+    """
+
+    def __init__(self, diretorio, tamanho_segmento=16 * 1024 * 1024, intervalo_fsync=0.01,
+                 limite_bytes=1024 ** 3, max_processos=64):
+        self.base = diretorio
+        self.tamanho_segmento = tamanho_segmento
+        self.intervalo_fsync = intervalo_fsync
+        self.limite_bytes = limite_bytes
+        self.max_processos = max_processos
+        self.diretorio = None
+        self._trava = None
+        self._lock_abertura = threading.Lock()
+
+    def abrir(self, indice=None):
+        """Trava e abre um subdiretório (o primeiro livre, ou `indice`). False se `indice` está em uso."""
+        with self._lock_abertura:
+            if self.diretorio is not None:
+                return True
+            for i in ([indice] if indice is not None else range(self.max_processos)):
+                diretorio = os.path.join(self.base, f"{i:02d}")
+                os.makedirs(diretorio, exist_ok=True)
+                self._trava = trava_arquivo(os.path.join(diretorio, ".trava"))
+                if self._trava is not None:
+                    break
+            else:
+                if indice is not None:
+                    return False
+                raise RuntimeError(f"nenhum dos {self.max_processos} spools em {self.base} está livre")
+            self._abrir(diretorio)
+            return True
+
+    @staticmethod
+    def indices(diretorio):
+        """Subdiretórios de spool existentes em `diretorio`."""
+        if not os.path.isdir(diretorio):
+            return []
+        return sorted(int(nome) for nome in os.listdir(diretorio) if nome.isdigit())
+
+    def _abrir(self, diretorio):
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+        self._duravel = threading.Condition(self._lock)
+        self._lock_checkpoint = threading.Lock()
+
+        self.checkpoint = self._carregar_checkpoint()
+        self.pendentes, self.pendentes_bytes = self._recuperar()
+
+        # Tudo que estava no spool ao abrir foi escrito por um processo anterior
+        numero = max(self._segmentos() + [self.checkpoint[0]]) + 1
+        self.inicio_sessao = (numero, 0)
+        self._abrir_segmento(numero)
+
+        self._escritas = 0          # escritas feitas nesta sessão
+        self._escritas_duraveis = 0  # ... já cobertas por um fsync
+        self._fds_antigos = []       # segmentos fechados para escrita, à espera do último fsync
+        self._parar = False
+
+        # Métricas
+        self.acrescentados = 0
+        self.confirmados = 0
+        self.fsyncs = 0
+        self.maior_fsync = 0.0
+        self.rejeitados_cheio = 0
+        self.quarentenados = 0
+
+        self._thread = threading.Thread(target=self._sincronizar, name='spool-fsync', daemon=True)
+        self._thread.start()
+
+    # ---------------- arquivos ----------------
+
+    def _segmentos(self):
+        numeros = []
+        for nome in os.listdir(self.diretorio):
+            if nome.startswith(PREFIXO_SEGMENTO) and nome.endswith(SUFIXO_SEGMENTO):
+                numeros.append(int(nome[len(PREFIXO_SEGMENTO):-len(SUFIXO_SEGMENTO)]))
+        return sorted(numeros)
+
+    def _caminho(self, numero):
+        return os.path.join(self.diretorio, _nome_segmento(numero))
+
+    def _carregar_checkpoint(self):
+        try:
+            with open(os.path.join(self.diretorio, "checkpoint.json"), encoding="utf-8") as f:
+                dados = json.load(f)
+            return (int(dados["segmento"]), int(dados["posicao"]))
+        except FileNotFoundError:
+            return (0, 0)
+
+    def _recuperar(self):
+        """Apaga segmentos já confirmados, corta um registro incompleto no fim e conta os pendentes."""
+        pendentes = 0
+        pendentes_bytes = 0
+        segmentos = self._segmentos()
+        for numero in segmentos:
+            caminho = self._caminho(numero)
+            if numero < self.checkpoint[0]:
+                os.remove(caminho)
+                continue
+            with open(caminho, "rb") as f:
+                dados = f.read()
+            inicio = self.checkpoint[1] if numero == self.checkpoint[0] else 0
+            registros = _registros(memoryview(dados)[inicio:])
+            fim = inicio + (registros[-1][1] if registros else 0)
+            if fim < len(dados):
+                print(f"Spool: {len(dados) - fim} bytes incompletos descartados no fim de {caminho}")
+                with open(caminho, "r+b") as f:
+                    f.truncate(fim)
+                    f.flush()
+                    os.fsync(f.fileno())
+            pendentes += len(registros)
+            pendentes_bytes += fim - inicio
+        if pendentes:
+            print(f"Spool: {pendentes} registros pendentes de uma execução anterior")
+        return pendentes, pendentes_bytes
+
+    def _abrir_segmento(self, numero):
+        self._numero = numero
+        self._fd = os.open(self._caminho(numero), os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0))
+        self._tamanho = 0
+        _fsync_diretorio(self.diretorio)
+
+    # ---------------- escrita ----------------
+
+    def acrescentar(self, itens, duravel=False):
+        """Acrescenta os registros (bytes). Levanta SpoolCheio acima de `limite_bytes` pendentes."""
+        quadro = b"".join(CABECALHO.pack(len(item), zlib.crc32(item)) + item for item in itens)
+        with self._lock:
+            if self.limite_bytes and self.pendentes_bytes + len(quadro) > self.limite_bytes:
+                self.rejeitados_cheio += len(itens)
+                raise SpoolCheio(f"spool com {self.pendentes_bytes} bytes pendentes")
+            if self._tamanho and self._tamanho + len(quadro) > self.tamanho_segmento:
+                # O fd antigo só é fechado pela thread de fsync, depois do último fsync nele
+                self._fds_antigos.append(self._fd)
+                self._abrir_segmento(self._numero + 1)
+            os.write(self._fd, quadro)
+            self._tamanho += len(quadro)
+            self._escritas += 1
+            self.pendentes += len(itens)
+            self.pendentes_bytes += len(quadro)
+            self.acrescentados += len(itens)
+            ticket = self._escritas
+            if duravel:
+                while self._escritas_duraveis < ticket and not self._parar:
+                    self._duravel.wait()
+        return ticket
+
+    def _sincronizar(self):
+        while True:
+            time.sleep(self.intervalo_fsync)
+            with self._lock:
+                alvo = self._escritas
+                fd = self._fd
+                antigos, self._fds_antigos = self._fds_antigos, []
+                parar = self._parar
+            if alvo > self._escritas_duraveis or antigos:
+                inicio = time.perf_counter()
+                for antigo in antigos:
+                    os.fsync(antigo)
+                    os.close(antigo)
+                os.fsync(fd)
+                duracao = time.perf_counter() - inicio
+                with self._lock:
+                    self._escritas_duraveis = max(self._escritas_duraveis, alvo)
+                    self.fsyncs += 1
+                    self.maior_fsync = max(self.maior_fsync, duracao)
+                    self._duravel.notify_all()
+            if parar:
+                return
+
+    def fechar(self):
+        if self.diretorio is None:
+            return
+        with self._lock:
+            self._parar = True
+        self._thread.join()
+        with self._lock:
+            self._duravel.notify_all()
+            os.close(self._fd)
+        self._trava.close()
+        self.diretorio = None
+
+    # ---------------- leitura e checkpoint ----------------
+
+    def ler(self, cursor, maximo, limite_leitura=4 * 1024 * 1024):
+        """Até `maximo` registros a partir de `cursor` (segmento, posição) e o cursor seguinte."""
+        numero, posicao = cursor
+        itens = []
+        while len(itens) < maximo:
+            with self._lock:
+                atual, tamanho_atual = self._numero, self._tamanho
+            if numero > atual:
+                break
+            caminho = self._caminho(numero)
+            if not os.path.exists(caminho):
+                if numero >= atual:
+                    break
+                numero, posicao = numero + 1, 0
+                continue
+            # No segmento atual só lê o que já foi escrito por inteiro
+            fim = tamanho_atual if numero == atual else os.path.getsize(caminho)
+            if posicao >= fim:
+                if numero >= atual:
+                    break
+                numero, posicao = numero + 1, 0
+                continue
+            with open(caminho, "rb") as f:
+                f.seek(posicao)
+                dados = f.read(min(fim - posicao, limite_leitura))
+            registros = _registros(dados, maximo - len(itens))
+            if not registros:
+                if len(dados) < fim - posicao:
+                    # Registro maior que limite_leitura: lê o resto do segmento
+                    with open(caminho, "rb") as f:
+                        f.seek(posicao)
+                        registros = _registros(f.read(fim - posicao), maximo - len(itens))
+                if not registros:
+                    print(f"Spool: registro corrompido em {caminho} na posição {posicao}, pulando o resto do segmento")
+                    if numero >= atual:
+                        break
+                    numero, posicao = numero + 1, 0
+                    continue
+            itens.extend(conteudo for conteudo, _ in registros)
+            posicao += registros[-1][1]
+        return itens, (numero, posicao)
+
+    def confirmar(self, cursor, itens):
+        """`itens` (lidos até `cursor`) estão no banco: grava o checkpoint e apaga segmentos consumidos."""
+        with self._lock_checkpoint:
+            caminho = os.path.join(self.diretorio, "checkpoint.json")
+            tmp = caminho + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"segmento": cursor[0], "posicao": cursor[1]}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, caminho)
+            anterior = self.checkpoint[0]
+            self.checkpoint = cursor
+            for numero in range(anterior, cursor[0]):
+                try:
+                    os.remove(self._caminho(numero))
+                except FileNotFoundError:
+                    pass
+        with self._lock:
+            self.pendentes -= len(itens)
+            self.pendentes_bytes -= sum(len(item) for item in itens) + CABECALHO.size * len(itens)
+            self.confirmados += len(itens)
+
+    def quarentena(self, itens):
+        """Guarda em quarentena.log (mesmo formato dos segmentos) registros que não serão gravados.
+
+        Chamado antes de `confirmar` passar por eles, então nada some do disco.
+        """
+        quadro = b"".join(CABECALHO.pack(len(item), zlib.crc32(item)) + item for item in itens)
+        with open(os.path.join(self.diretorio, "quarentena.log"), "ab") as f:
+            f.write(quadro)
+            f.flush()
+            os.fsync(f.fileno())
+        with self._lock:
+            self.quarentenados += len(itens)
+
+    def da_sessao_anterior(self, cursor):
+        """True se o registro no `cursor` foi escrito antes desta abertura (pode já estar no banco)."""
+        return cursor < self.inicio_sessao
+
+    def metricas(self):
+        if self.diretorio is None:
+            return {"aberto": False, "pendentes": 0}
+        with self._lock:
+            return {
+                "diretorio": self.diretorio,
+                "pendentes": self.pendentes,
+                "pendentes_bytes": self.pendentes_bytes,
+                "limite_bytes": self.limite_bytes,
+                "segmento_atual": self._numero,
+                "checkpoint": list(self.checkpoint),
+                "acrescentados": self.acrescentados,
+                "confirmados": self.confirmados,
+                "rejeitados_cheio": self.rejeitados_cheio,
+                "quarentenados": self.quarentenados,
+                "fsyncs": self.fsyncs,
+                "maior_fsync_s": self.maior_fsync
+            }
@@ -0,0 +1,134 @@
+import json
+import threading
+
+from flask import Response, jsonify, request, stream_with_context
+
+# ********************* TRANSMISSÃO AO VIVO (SSE / LONG-POLL) *********************************
+
+
+class AssinanteAtrasado(Exception):
+    """O assinante ficou para trás além do limite e foi desconectado."""
+
+
+class Transmissor:
+    """Um único buffer circular de eventos lido por todos os assinantes.
+
+    `publicar` é O(1) e nunca espera pelos assinantes. Cada assinante guarda
+    apenas o número de sequência do último evento que leu; quem ficar mais de
+    `limite_backlog` eventos atrás (ou atrás do evento mais antigo ainda no
+    buffer) é desconectado com AssinanteAtrasado.
+    """
+
+    def __init__(self, capacidade=1000, limite_backlog=500, max_assinantes=100):
+        self.capacidade = capacidade
+        self.limite_backlog = min(limite_backlog, capacidade)
+        self.max_assinantes = max_assinantes
+        self._eventos = [None] * capacidade
+        self._sequencia = 0
+        self._condicao = threading.Condition()
+        self.assinantes = 0
+        self.publicados = 0
+        self.desconectados = 0
+
+    @property
+    def sequencia(self):
+        return self._sequencia
+
+    def publicar(self, evento):
+        with self._condicao:
+            self._sequencia += 1
+            self._eventos[self._sequencia % self.capacidade] = (self._sequencia, evento)
+            self.publicados += 1
+            self._condicao.notify_all()
+
+    def entrar(self):
+        with self._condicao:
+            if self.assinantes >= self.max_assinantes:
+                return False
+            self.assinantes += 1
+            return True
+
+    def sair(self):
+        with self._condicao:
+            self.assinantes -= 1
+
+    def aguardar(self, cursor, timeout):
+        """Eventos com sequência maior que `cursor`, esperando até `timeout` segundos por algum."""
+        with self._condicao:
+            # Cursor de antes de um reinício do servidor: recomeça do atual
+            cursor = min(cursor, self._sequencia)
+            if self._sequencia <= cursor:
+                self._condicao.wait_for(lambda: self._sequencia > cursor, timeout)
+            atraso = self._sequencia - cursor
+            if atraso > self.limite_backlog:
+                self.desconectados += 1
+                raise AssinanteAtrasado(f"{atraso} eventos pendentes")
+            return [self._eventos[s % self.capacidade] for s in range(cursor + 1, self._sequencia + 1)]
+
+    def metricas(self):
+        with self._condicao:
+            return {
+                "sequencia": self._sequencia,
+                "assinantes": self.assinantes,
+                "publicados": self.publicados,
+                "desconectados": self.desconectados
+            }
+
+
+def evento_mqtt(topico, leitura):
+    """Evento em uma linha de JSON com a leitura já decodificada do payload.
+
+    O payload vem de quem publica no broker: é decodificado antes (e
+    descartado se não for JSON) em vez de ser colado no envelope.
+    """
+    return json.dumps({"topico": topico, "leitura": leitura})
+
+
+def registra_rotas_transmissao(app, transmissor, keepalive=15.0):
+    """Endpoints /data/stream (Server-Sent Events) e /data/poll (long-poll)."""
+
+    @app.route('/data/stream', methods=['GET'])
+    def get_data_stream():
+        cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+        cursor = int(cursor) if cursor and cursor.isdigit() else transmissor.sequencia
+
+        def eventos(cursor):
+            if not transmissor.entrar():
+                yield "event: cheio\ndata: Limite de assinantes atingido\n\n"
+                return
+            try:
+                yield "retry: 3000\n\n"
+                while True:
+                    try:
+                        novos = transmissor.aguardar(cursor, keepalive)
+                    except AssinanteAtrasado as e:
+                        yield f"event: desconectado\ndata: {e}\n\n"
+                        return
+                    if not novos:
+                        yield ": keep-alive\n\n"
+                        continue
+                    for sequencia, evento in novos:
+                        yield f"id: {sequencia}\ndata: {evento}\n\n"
+                    cursor = novos[-1][0]
+            finally:
+                transmissor.sair()
+
+        return Response(stream_with_context(eventos(cursor)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.route('/data/poll', methods=['GET'])
+    def get_data_poll():
+        try:
+            cursor = int(request.args.get('cursor', transmissor.sequencia))
+            timeout = min(float(request.args.get('timeout', 25)), 60.0)
+        except ValueError:
+            return jsonify({"error": "cursor e timeout devem ser números"}), 400
+        try:
+            novos = transmissor.aguardar(cursor, timeout)
+        except AssinanteAtrasado:
+            return jsonify({"cursor": transmissor.sequencia, "eventos": [], "perdidos": True})
+        return jsonify({
+            "cursor": novos[-1][0] if novos else min(cursor, transmissor.sequencia),
+            "eventos": [json.loads(evento) for _, evento in novos],
+            "perdidos": False
+        })
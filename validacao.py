@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+
+# ********************* VALIDAÇÃO E DEDUPLICAÇÃO DA INGESTÃO *********************************
+#
+# Etapa única usada pelo MQTT (main.py e main_async.py) e pela API (/data e
+# /data/batch): mapeia os dois formatos de payload para as colunas do
+# Registro, confere tipos e faixas físicas e descarta leituras repetidas
+# (redeliveries do QoS 1) pela chave (dispositivo, timestamp).
+
+# Nome de cada coluna em cada formato de payload
+DIALETOS = {
+    # ESP32 via MQTT
+    "mqtt": {
+        "temperatura": "temperature",
+        "pressao": "pressure",
+        "altitude": "altitude",
+        "umidade": "humidity",
+        "co2": "CO2",
+        "tempo_registro": "timestamp"
+    },
+    # POST /data e /data/batch
+    "api": {
+        "temperatura": "temperatura",
+        "pressao": "pressao",
+        "altitude": "altitude",
+        "umidade": "umidade",
+        "co2": "co2",
+        "tempo_registro": "tempo_registro"
+    }
+}
+
+# Faixas físicas aceitas (inclusive). A pressão cobre hPa e Pa, que variam entre firmwares.
+FAIXAS = {
+    "temperatura": (-40.0, 85.0),
+    "pressao": (300.0, 120000.0),
+    "altitude": (-500.0, 9000.0),
+    "umidade": (0.0, 100.0),
+    "co2": (0.0, 50000.0)
+}
+
+# Timestamps antes disto são de placa sem relógio sincronizado (segundos desde o boot)
+TIMESTAMP_MINIMO = 946684800  # 2000-01-01
+
+TAMANHO_DISPOSITIVO = 64  # Registro.dispositivo é String(64)
+
+NUMEROS = (int, float)
+
+
+class ValidadorIngestao:
+    """Validação compilada uma vez por formato e deduplicação com LRU limitado.
+
+    `valida(dados, dialeto)` devolve (linha, None) ou (None, motivo); os
+    motivos são textos fixos montados na construção, então validar não cria
+    nada além do dict da linha aceita. `marcar(chave)` registra a chave
+    (dispositivo, timestamp) no LRU e devolve False se ela já foi vista;
+    `esquecer(chaves)` desfaz a marcação quando a gravação falha.
+    """
+
+    def __init__(self, faixas=None, capacidade_dedup=100000, tolerancia_futuro=86400):
+        faixas = dict(FAIXAS, **(faixas or {}))
+        self.capacidade_dedup = capacidade_dedup
+        self.tolerancia_futuro = tolerancia_futuro
+        self._regras = {
+            dialeto: (
+                tuple(
+                    (chaves[coluna], coluna, float(faixas[coluna][0]), float(faixas[coluna][1]),
+                     f"{coluna}_ausente", f"{coluna}_invalido", f"{coluna}_fora_da_faixa")
+                    for coluna in FAIXAS
+                ),
+                chaves["tempo_registro"]
+            )
+            for dialeto, chaves in DIALETOS.items()
+        }
+        self._vistos = OrderedDict()
+        self._lock = threading.Lock()
+        self.validos = 0
+        self.duplicados = 0
+        self.motivos = Counter()
+
+    def _rejeita(self, motivo):
+        with self._lock:
+            self.motivos[motivo] += 1
+        return None, motivo
+
+    def valida(self, dados, dialeto, dispositivo=None):
+        """Linha com as colunas do Registro (tempo_registro em UTC sem tz) ou o motivo da rejeição."""
+        if not isinstance(dados, dict):
+            return self._rejeita("formato_invalido")
+        regras, chave_tempo = self._regras[dialeto]
+
+        linha = {}
+        for chave, coluna, minimo, maximo, ausente, invalido, fora in regras:
+            valor = dados.get(chave)
+            if valor is None:
+                return self._rejeita(ausente)
+            # bool é subclasse de int: a comparação exata de classe o exclui
+            if valor.__class__ not in NUMEROS:
+                return self._rejeita(invalido)
+            if not minimo <= valor <= maximo:
+                # NaN também cai aqui (toda comparação com NaN é falsa)
+                return self._rejeita(fora)
+            linha[coluna] = valor
+
+        timestamp = dados.get(chave_tempo)
+        if timestamp is None:
+            return self._rejeita("timestamp_ausente")
+        try:
+            timestamp = int(timestamp)
+        except (ValueError, TypeError, OverflowError):
+            return self._rejeita("timestamp_invalido")
+        if timestamp < TIMESTAMP_MINIMO or timestamp > time.time() + self.tolerancia_futuro:
+            return self._rejeita("timestamp_fora_da_faixa")
+        linha["tempo_registro"] = datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None)
+
+        if dispositivo is None and dialeto == "api":
+            dispositivo = dados.get("dispositivo")
+        # No MQTT o dispositivo vem do tópico: um sufixo longo demais faria o insert do lote inteiro falhar
+        if dispositivo is not None and (not isinstance(dispositivo, str) or len(dispositivo) > TAMANHO_DISPOSITIVO):
+            return self._rejeita("dispositivo_invalido")
+        linha["dispositivo"] = dispositivo
+        with self._lock:
+            self.validos += 1
+        return linha, None
+
+    # ---------------- deduplicação ----------------
+
+    @staticmethod
+    def chave(linha):
+        return (linha["dispositivo"], linha["tempo_registro"])
+
+    def marcar(self, chave):
+        """True se a chave é nova (e passa a ser lembrada); False se é repetida."""
+        with self._lock:
+            if chave in self._vistos:
+                self._vistos.move_to_end(chave)
+                self.duplicados += 1
+                return False
+            self._vistos[chave] = None
+            if len(self._vistos) > self.capacidade_dedup:
+                self._vistos.popitem(last=False)
+            return True
+
+    def esquecer(self, chaves):
+        with self._lock:
+            for chave in chaves:
+                self._vistos.pop(chave, None)
+
+    def metricas(self):
+        with self._lock:
+            return {
+                "validos": self.validos,
+                "duplicados": self.duplicados,
+                "rejeitados": sum(self.motivos.values()),
+                "motivos": dict(self.motivos),
+                "dedup_tamanho": len(self._vistos),
+                "dedup_capacidade": self.capacidade_dedup
+            }
+
+
+def descreve_motivo(motivo):
+    """Texto legível para as respostas da API ('co2_fora_da_faixa' -> 'co2 fora da faixa')."""
+    return motivo.replace("_", " ")
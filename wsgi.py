@@ -0,0 +1,24 @@
+"""Ponto de entrada da API para servidores WSGI com vários processos.
+
+    gunicorn -w 4 -b 0.0.0.0:5000 wsgi:app
+    python consumidor.py
+
+Sem --preload: cada worker importa este módulo depois do fork, então o pool
+de conexões, o spool (SPOOL_DIR/NN, um por worker) e o cliente MQTT não
+são compartilhados entre processos. Os workers só gravam o que chega por
+POST /data; as leituras MQTT são gravadas pelo consumidor.py. Cada worker
+ainda assina o tópico (sem gravar) para manter o cache de GET /data e o
+/data/stream ao vivo; MQTT_AO_VIVO=0 desliga isso.
+
+A exportação para o Google Sheets fica com o consumidor.
+"""
+import os
+
+import main
+
+app = main.app
+
+main.pipeline.exportar = None
+main.pipeline.iniciar()
+if os.environ.get('MQTT_AO_VIVO', '1') == '1':
+    main.start_mqtt(gravar=False, ao_vivo=True)